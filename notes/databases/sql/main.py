@@ -1,5 +1,199 @@
+"""Benchmark the SQL snippets from the course notes against ``db/course.db``.
+
+Every ```sql block in ``notes/course_01`` and ``notes/course_02`` is split into
+statements. Read-only statements (``SELECT``/``WITH``) are run several times
+and reported with their median/p95 latency, the number of rows returned and
+their ``EXPLAIN QUERY PLAN``. Anything else is skipped: the database is opened
+read-only, so a benchmark run never modifies it.
+
+    python main.py --repeat 10 --json results.json
+"""
+
+import argparse
+import json
+import math
+import re
+import sqlite3
+import statistics
+import textwrap
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+DB_PATH = BASE_DIR / "db" / "course.db"
+NOTES_DIR = BASE_DIR / "notes"
+
+REPEAT = 5  # Timed runs per query (after one warm-up run)
+TIMEOUT = 10.0  # Seconds before a single run is interrupted
+
+SQL_BLOCK = re.compile(
+    r"^[ \t]*```sql[ \t]*\n(.*?)^[ \t]*```", re.MULTILINE | re.DOTALL
+)
+FIRST_KEYWORD = re.compile(r"^\s*(?:--[^\n]*\n\s*)*(\w+)")
+READ_ONLY_KEYWORDS = {"SELECT", "WITH"}
+
+
+@dataclass
+class Query:
+    source: str  # e.g. "course_01/10_group_by.md#2.1" (block 2, statement 1)
+    sql: str
+
+
+@dataclass
+class Result:
+    source: str
+    sql: str
+    status: str  # "ok", "error" or "skipped"
+    rows: int | None = None
+    median_ms: float | None = None
+    p95_ms: float | None = None
+    plan: list[str] = field(default_factory=list)
+    error: str | None = None
+
+
+def split_statements(block):
+    """Split a code block into statements; the last one may lack a semicolon."""
+    statements = []
+    buffer = ""
+    for line in block.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+    if buffer.strip():
+        statements.append(buffer.strip())
+    return statements
+
+
+def extract_queries(notes_dir):
+    for path in sorted(notes_dir.glob("course_0*/*.md")):
+        text = path.read_text(encoding="utf-8")
+        source = path.relative_to(notes_dir).as_posix()
+
+        for n, match in enumerate(SQL_BLOCK.finditer(text), start=1):
+            block = textwrap.dedent(match.group(1))
+            for m, statement in enumerate(split_statements(block), start=1):
+                yield Query(f"{source}#{n}.{m}", statement)
+
+
+def is_read_only(sql):
+    match = FIRST_KEYWORD.match(sql)
+    return match is not None and match.group(1).upper() in READ_ONLY_KEYWORDS
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def format_plan(rows):
+    """Indent ``EXPLAIN QUERY PLAN`` rows (id, parent, notused, detail) as a tree."""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def run_query(connection, query, repeat, timeout):
+    if not is_read_only(query.sql):
+        return Result(query.source, query.sql, "skipped")
+
+    deadline = 0.0
+
+    def interrupt():
+        # A non-zero return value makes SQLite abort the running statement
+        return time.perf_counter() > deadline
+
+    connection.set_progress_handler(interrupt, 10_000)
+    try:
+        plan = connection.execute(f"EXPLAIN QUERY PLAN {query.sql}").fetchall()
+
+        timings = []
+        for run in range(repeat + 1):
+            deadline = time.perf_counter() + timeout
+            start = time.perf_counter()
+            rows = len(connection.execute(query.sql).fetchall())
+            if run:  # The first run only warms up the page cache
+                timings.append(time.perf_counter() - start)
+    except sqlite3.Error as exc:
+        return Result(query.source, query.sql, "error", error=str(exc))
+    finally:
+        connection.set_progress_handler(None, 0)
+
+    return Result(
+        query.source,
+        query.sql,
+        "ok",
+        rows=rows,
+        median_ms=statistics.median(timings) * 1000,
+        p95_ms=percentile(timings, 95) * 1000,
+        plan=format_plan(plan),
+    )
+
+
+def print_report(results):
+    for result in results:
+        if result.status == "ok":
+            print(
+                f"{result.source:<45} rows={result.rows:<8} "
+                f"median={result.median_ms:9.3f} ms  p95={result.p95_ms:9.3f} ms"
+            )
+            for line in result.plan:
+                print(f"    {line}")
+        elif result.status == "error":
+            print(f"{result.source:<45} error: {result.error}")
+
+    counts = {
+        status: sum(result.status == status for result in results)
+        for status in ("ok", "error", "skipped")
+    }
+    print()
+    print(
+        f"{len(results)} statements: {counts['ok']} benchmarked, "
+        f"{counts['error']} failed, {counts['skipped']} skipped (not read-only)"
+    )
+
+
 def main():
-    print("Hello from sql!")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="SQLite database")
+    parser.add_argument("--notes", type=Path, default=NOTES_DIR, help="Notes folder")
+    parser.add_argument(
+        "--repeat", type=int, default=REPEAT, help="Timed runs per query"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=TIMEOUT, help="Seconds allowed per run"
+    )
+    parser.add_argument(
+        "--filter", default="", help="Only run queries whose source contains this text"
+    )
+    parser.add_argument("--json", type=Path, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    # mode=ro: the notes also contain INSERT/UPDATE/DELETE examples
+    connection = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    try:
+        results = [
+            run_query(connection, query, args.repeat, args.timeout)
+            for query in extract_queries(args.notes)
+            if args.filter in query.source
+        ]
+    finally:
+        connection.close()
+
+    print_report(results)
+    if args.json:
+        args.json.write_text(
+            json.dumps([asdict(result) for result in results], indent=2),
+            encoding="utf-8",
+        )
 
 
 if __name__ == "__main__":
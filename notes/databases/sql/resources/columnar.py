@@ -0,0 +1,167 @@
+"""Formato columnar para el conjunto de datos del curso.
+
+Cada tabla es una carpeta con un archivo binario por columna, sin encabezados:
+
+- Números y fechas: los valores tal cual en memoria (``<i8``, ``<f8``, ``<M8[D]``).
+- Texto: ``<columna>.offsets`` (``<i8``, n + 1 posiciones) y ``<columna>.data``
+  (los textos en UTF-8, uno detrás de otro).
+
+``manifest.json`` guarda las filas y el tipo de cada columna. Los archivos se
+abren con ``np.memmap``, así que cargar una tabla no requiere analizar nada:
+
+    from columnar import cargar_columnas
+
+    tablas = cargar_columnas("dataset/")
+    tablas["ventas"]["Ventas_Total"].sum()
+    tablas["productos"]["Prod_Descripcion"][0]
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+VERSION = 1
+MANIFEST = "manifest.json"
+TEXTO = "text"
+
+
+class Columnas:
+    """Fragmento de una tabla como una tupla de arreglos de NumPy, uno por columna.
+
+    Al iterarlo produce filas de valores nativos de Python, de modo que puede
+    pasarse a cualquier escritor; ``ColumnarWriter`` usa los arreglos directamente.
+    """
+
+    def __init__(self, columnas):
+        self.columnas = columnas
+
+    def __iter__(self):
+        return zip(
+            *(
+                np.datetime_as_string(columna).tolist()
+                if columna.dtype.kind == "M"  # Fechas: datetime64 -> 'AAAA-MM-DD'
+                else columna.tolist()
+                for columna in self.columnas
+            )
+        )
+
+
+class ColumnarWriter:
+    """Escribe las filas de cada tabla como columnas binarias en ``directorio``.
+
+    Se usa como gestor de contexto: ``manifest.json`` sólo se escribe si la
+    exportación termina sin errores.
+    """
+
+    def __init__(self, directorio):
+        self.directorio = Path(directorio)
+        self.tablas = {}
+        self._archivos = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for archivo in self._archivos.values():
+            archivo.close()
+        if exc_type is None:
+            manifest = {"version": VERSION, "tablas": self.tablas}
+            (self.directorio / MANIFEST).write_text(
+                json.dumps(manifest, indent=2), encoding="utf-8"
+            )
+
+    def insert(self, table, columns, rows):
+        if isinstance(rows, Columnas):
+            columnas = rows.columnas
+        else:
+            columnas = list(zip(*rows))  # Filas de Python -> columnas
+        if not columnas or not len(columnas[0]):
+            return
+
+        tabla = self.tablas.setdefault(table, {"filas": 0, "columnas": {}})
+        for column, valores in zip(columns, columnas):
+            self._escribir(table, column, valores)
+        tabla["filas"] += len(columnas[0])
+
+    def _escribir(self, table, column, valores):
+        columnas = self.tablas[table]["columnas"]
+
+        if not isinstance(valores, np.ndarray) and isinstance(valores[0], str):
+            columnas.setdefault(column, {"tipo": TEXTO, "bytes": 0})
+            datos = [valor.encode("utf-8") for valor in valores]
+            finales = np.cumsum([len(dato) for dato in datos], dtype="<i8")
+            inicio = columnas[column]["bytes"]
+
+            self._archivo(table, f"{column}.offsets", primer_offset=True).write(
+                (finales + inicio).tobytes()
+            )
+            self._archivo(table, f"{column}.data").write(b"".join(datos))
+            columnas[column]["bytes"] = inicio + int(finales[-1])
+            return
+
+        array = np.asarray(valores)
+        if array.dtype.kind in "iub":
+            array = array.astype("<i8")
+        elif array.dtype.kind == "f":
+            array = array.astype("<f8")
+        columnas.setdefault(column, {"tipo": array.dtype.str})
+        self._archivo(table, column).write(array.tobytes())
+
+    def _archivo(self, table, nombre, primer_offset=False):
+        clave = (table, nombre)
+        if clave not in self._archivos:
+            path = self.directorio / table / nombre
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Quedan abiertos entre lotes; ``__exit__`` los cierra
+            self._archivos[clave] = open(path, "wb")  # noqa: SIM115
+            if primer_offset:  # n textos necesitan n + 1 offsets
+                self._archivos[clave].write(np.zeros(1, dtype="<i8").tobytes())
+        return self._archivos[clave]
+
+
+class ColumnaTexto:
+    """Columna de texto sobre los arreglos mapeados de offsets y datos."""
+
+    def __init__(self, offsets, datos):
+        self.offsets = offsets
+        self.datos = datos
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        inicio, fin = self.offsets[i], self.offsets[i + 1]
+        return bytes(self.datos[inicio:fin]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def _mapear(path, dtype):
+    if path.stat().st_size == 0:
+        return np.empty(0, dtype=dtype)  # mmap no admite archivos vacíos
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def cargar_columnas(directorio):
+    """Devuelve ``{tabla: {columna: arreglo}}`` mapeando los archivos en memoria."""
+    directorio = Path(directorio)
+    manifest = json.loads((directorio / MANIFEST).read_text(encoding="utf-8"))
+    if manifest["version"] != VERSION:
+        raise ValueError(f"Versión de formato no soportada: {manifest['version']}")
+
+    tablas = {}
+    for table, tabla in manifest["tablas"].items():
+        tablas[table] = {}
+        for column, meta in tabla["columnas"].items():
+            if meta["tipo"] == TEXTO:
+                tablas[table][column] = ColumnaTexto(
+                    _mapear(directorio / table / f"{column}.offsets", "<i8"),
+                    _mapear(directorio / table / f"{column}.data", np.uint8),
+                )
+            else:
+                tablas[table][column] = _mapear(
+                    directorio / table / column, meta["tipo"]
+                )
+    return tablas
@@ -1,10 +1,32 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
 import random
-from datetime import date, timedelta
+import sqlite3
+import sys
+from dataclasses import dataclass, replace
+from multiprocessing import Pool
+from pathlib import Path
 
+import numpy as np
+from columnar import ColumnarWriter, Columnas
 from faker import Faker
 
 # Configuración de Faker
-fake = Faker("es_ES")  # Usamos español para nombres y descripciones
+LOCALE = "es_ES"  # Usamos español para nombres y descripciones
+fake = Faker(LOCALE)
+
+# --- Pools de nombres (opcional, --name-pool) ---
+# Los proveedores de Faker usados por el generador
+PROVEEDORES_FAKER = ("company", "catch_phrase", "color_name")
+POOL_SIZE = 5000  # Valores únicos por proveedor de Faker
+# Pools cargados en este proceso; None = llamar a Faker en cada fila
+NOMBRES = None
+
+# Índice de precios de los productos en centavos: PRECIOS[Prod_Id] = Prod_Precio * 100
+PRECIOS = None
 
 # --- Configuración de la cantidad de registros a generar ---
 NUM_PROVEEDORES = 50
@@ -13,34 +35,42 @@ NUM_PRODUCTOS = 1000
 NUM_VENTAS = 5000
 NUM_VENTAS_DETALLE_PER_VENTA = 3  # Promedio de ítems por venta
 
-# --- Generación de IDs para mantener la referencia ---
-proveedor_ids = []
-cliente_ids = []
-producto_ids = []
-venta_ids = []
-
-# --- Encabezado del archivo SQL ---
-print("-- SQL generado para SQLite")
-print("-- Habilitar la verificación de claves foráneas (importante para SQLite)")
-print("PRAGMA foreign_keys = ON;")
-print()
-
-# --- INICIAR UNA TRANSACCIÓN GRANDE AQUÍ para una importación más rápida ---
-print("BEGIN TRANSACTION;")
-print()
-
-# --- DROP TABLES (en orden inverso de dependencia para asegurar que no haya errores de FK) ---
-print("-- 1. DROP TABLES")
-print('DROP TABLE IF EXISTS "ventas_detalle";')
-print('DROP TABLE IF EXISTS "ventas";')
-print('DROP TABLE IF EXISTS "productos";')
-print('DROP TABLE IF EXISTS "clientes";')
-print('DROP TABLE IF EXISTS "proveedores";')
-print()
-
-# --- CREATE TABLES (en orden de dependencia) ---
-print("-- 2. CREATE TABLES")
-print("""
+# --- Perfiles de escala (--profile) ---
+# Cantidades de (proveedores, clientes, productos, ventas). Con unos 3,5 ítems
+# por venta, "xl" ronda los 50 millones de filas entre ventas y ventas_detalle.
+PERFILES = {
+    "small": (NUM_PROVEEDORES, NUM_CLIENTES, NUM_PRODUCTOS, NUM_VENTAS),
+    "medium": (200, 5_000, 20_000, 200_000),
+    "large": (1_000, 50_000, 100_000, 2_000_000),
+    "xl": (5_000, 250_000, 500_000, 11_000_000),
+}
+
+# --- Configuración de la generación en paralelo ---
+SEED = 42  # Semilla maestra: la misma semilla produce siempre los mismos datos
+CHUNK_SIZE = 2000  # IDs por fragmento; cada fragmento es una tarea del pool
+
+# --- Configuración de la escritura ---
+BATCH_SIZE = 500  # Filas por cada sentencia INSERT multi-fila
+BUFFER_SIZE = 1024 * 1024  # 1 MiB de buffer para el archivo de salida
+
+# PRAGMAs aplicados durante la carga directa (--direct). Sacrifican durabilidad
+# a cambio de velocidad: si la carga se interrumpe, basta con volver a generarla.
+LOAD_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "cache_size": -256 * 1024,  # Negativo = KiB, es decir, 256 MiB de caché
+    "temp_store": "MEMORY",
+}
+# Al anexar datos (--append) la base ya existe: con WAL, interrumpir la carga
+# no la corrompe, sólo se pierde la transacción en curso.
+APPEND_PRAGMAS = {**LOAD_PRAGMAS, "journal_mode": "WAL"}
+# PRAGMAs restaurados al terminar la carga
+DEFAULT_PRAGMAS = {
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+}
+
+SCHEMA = """
 CREATE TABLE IF NOT EXISTS "proveedores" (
   "Prov_Id" INTEGER PRIMARY KEY AUTOINCREMENT,
   "Prov_Nombre" TEXT NOT NULL DEFAULT ''
@@ -82,95 +112,582 @@ CREATE TABLE IF NOT EXISTS "ventas_detalle" (
   FOREIGN KEY ("VD_VentasId") REFERENCES "ventas"("Ventas_Id"),
   FOREIGN KEY ("VD_ProdId") REFERENCES "productos"("Prod_Id")
 );
-""")
-print()
-
-# --- DELETE FROM (para limpiar tablas existentes antes de insertar nuevos datos) ---
-print("-- 3. DELETE FROM")
-print('DELETE FROM "ventas_detalle";')
-print('DELETE FROM "ventas";')
-print('DELETE FROM "productos";')
-print('DELETE FROM "clientes";')
-print('DELETE FROM "proveedores";')
-print()
-
-# --- 4. INSERT DATA (¡EN ESTE ORDEN PARA RESPETAR LAS CLAVES FORÁNEAS!) ---
-
-print("-- 4.1. Insertando datos en 'proveedores'")
-for i in range(1, NUM_PROVEEDORES + 1):
-    proveedor_ids.append(i)
-    nombre = fake.company().replace("'", "''")  # Escapar comillas simples
-    print(
-        f'INSERT INTO "proveedores" ("Prov_Id", "Prov_Nombre") VALUES ({i}, \'{nombre}\');'
+"""
+
+# Índices secundarios para las claves foráneas y las fechas de venta. Se crean
+# después de la carga masiva (mantenerlos fila a fila es mucho más lento) y
+# cubren las columnas que suman los ejercicios, para que los JOIN y GROUP BY
+# se resuelvan sin leer la tabla.
+INDEXES = """
+CREATE INDEX IF NOT EXISTS "idx_ventas_detalle_venta"
+  ON "ventas_detalle" ("VD_VentasId", "VD_ProdId", "VD_Cantidad", "VD_Precio");
+
+CREATE INDEX IF NOT EXISTS "idx_ventas_detalle_producto"
+  ON "ventas_detalle" ("VD_ProdId", "VD_VentasId", "VD_Cantidad", "VD_Precio");
+
+CREATE INDEX IF NOT EXISTS "idx_ventas_cliente"
+  ON "ventas" ("Ventas_CliId", "Ventas_Fecha", "Ventas_Total");
+
+CREATE INDEX IF NOT EXISTS "idx_ventas_fecha"
+  ON "ventas" ("Ventas_Fecha", "Ventas_CliId", "Ventas_Total");
+
+CREATE INDEX IF NOT EXISTS "idx_productos_proveedor"
+  ON "productos" ("Prod_ProvId", "Prod_Precio");
+"""
+
+# Tablas en orden de dependencia (padres antes que hijos)
+TABLES = ("proveedores", "clientes", "productos", "ventas", "ventas_detalle")
+
+COLUMNS = {
+    "proveedores": ("Prov_Id", "Prov_Nombre"),
+    "clientes": ("Cli_Id", "Cli_RazonSocial"),
+    "productos": (
+        "Prod_Id",
+        "Prod_Descripcion",
+        "Prod_Color",
+        "Prod_Status",
+        "Prod_Precio",
+        "Prod_ProvId",
+    ),
+    "ventas": (
+        "Ventas_Id",
+        "Ventas_Fecha",
+        "Ventas_CliId",
+        "Ventas_NroFactura",
+        "Ventas_Neto",
+        "Ventas_Iva",
+        "Ventas_Total",
+    ),
+    "ventas_detalle": (
+        "VD_Id",
+        "VD_VentasId",
+        "VD_ProdId",
+        "VD_Cantidad",
+        "VD_Precio",
+        "VD_Costo",
+    ),
+}
+
+
+def sql_literal(value):
+    """Convierte un valor de Python en un literal SQL."""
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"  # Escapar comillas simples
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+class SQLWriter:
+    """Escribe el script SQL agrupando filas en sentencias INSERT multi-fila.
+
+    Cada ``INSERT`` lleva hasta ``batch_size`` filas, de modo que SQLite
+    analiza una sentencia por lote en lugar de una por fila.
+    """
+
+    def __init__(self, stream, batch_size=BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError("batch_size debe ser al menos 1")
+
+        self.stream = stream
+        self.batch_size = batch_size
+
+    def write(self, text=""):
+        self.stream.write(text + "\n")
+
+    def insert(self, table, columns, rows):
+        """Escribe ``rows`` en lotes de ``batch_size`` filas por sentencia."""
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        header = f'INSERT INTO "{table}" ({column_list}) VALUES\n'
+        batch = []
+
+        for row in rows:
+            batch.append("(" + ", ".join(map(sql_literal, row)) + ")")
+            if len(batch) == self.batch_size:
+                self.stream.write(header + ",\n".join(batch) + ";\n")
+                batch.clear()
+
+        if batch:
+            self.stream.write(header + ",\n".join(batch) + ";\n")
+
+
+class SQLiteLoader:
+    """Carga las filas directamente en una base SQLite con ``executemany``.
+
+    Evita formatear el SQL como texto para que luego ``sqlite3`` lo vuelva a
+    analizar: cada tabla se inserta con una única sentencia preparada.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def insert(self, table, columns, rows):
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        placeholders = ", ".join("?" * len(columns))
+        self.connection.executemany(
+            f'INSERT INTO "{table}" ({column_list}) VALUES ({placeholders})', rows
+        )
+
+
+# --- Generación por fragmentos ---
+# Cada tabla se divide en fragmentos de IDs consecutivos. Cada fragmento usa su
+# propia semilla, derivada de la semilla maestra, de la tabla y de su primer ID,
+# así que el resultado no depende de qué proceso lo genere ni de cuántos haya.
+
+
+@dataclass(frozen=True)
+class Configuracion:
+    proveedores: int = NUM_PROVEEDORES
+    clientes: int = NUM_CLIENTES
+    productos: int = NUM_PRODUCTOS
+    ventas: int = NUM_VENTAS
+    seed: int = SEED
+    chunk_size: int = CHUNK_SIZE
+
+
+def semilla(seed, table, start):
+    """Deriva una semilla de 64 bits estable para el fragmento que empieza en ``start``."""
+    digest = hashlib.sha256(f"{seed}:{table}:{start}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def nombre_falso(rng, proveedor):
+    """Devuelve un valor del pool de ``proveedor`` o, si no hay pools, de Faker."""
+    if NOMBRES is None:
+        return getattr(fake, proveedor)()
+    return rng.choice(NOMBRES[proveedor])
+
+
+def generar_proveedores(rng, start, stop, config):
+    return [(i, nombre_falso(rng, "company")) for i in range(start, stop)]
+
+
+def generar_clientes(rng, start, stop, config):
+    return [(i, nombre_falso(rng, "company")) for i in range(start, stop)]
+
+
+def generar_productos(rng, start, stop, config):
+    filas = []
+    for i in range(start, stop):
+        descripcion = nombre_falso(rng, "catch_phrase")
+        color = nombre_falso(rng, "color_name")
+        status = rng.randint(0, 1)
+        precio = round(rng.uniform(5.0, 500.0), 2)
+        prov_id = rng.randint(1, config.proveedores)  # Un proveedor existente
+        filas.append((i, descripcion, color, status, precio, prov_id))
+    return filas
+
+
+def generar_ventas(rng, start, stop, config):
+    """Genera las ventas ``[start, stop)`` junto con sus detalles, columna a columna.
+
+    Cada columna se obtiene de una sola vez como un arreglo de NumPy; las filas
+    sólo se materializan al escribir. El precio de cada detalle sale del índice
+    ``PRECIOS`` y el Neto de cada venta es la suma de sus detalles. Los detalles
+    se devuelven sin ``VD_Id``: sólo se conoce al unir los fragmentos en orden,
+    porque depende de cuántos ítems tuvieron los anteriores.
+    """
+    # El generador de NumPy toma la misma semilla que el random.Random del fragmento
+    rng = np.random.default_rng(rng.getrandbits(64))
+    start_date = np.datetime64("2023-01-01")
+    end_date = np.datetime64("2024-12-31")
+    time_delta = (end_date - start_date).astype(int)
+    n = stop - start
+
+    venta_ids = np.arange(start, stop)
+    fechas = start_date + rng.integers(0, time_delta, n, endpoint=True)
+    cli_ids = rng.integers(1, config.clientes, n, endpoint=True)  # Clientes existentes
+    nro_facturas = rng.integers(1000, 9999, n, endpoint=True)
+
+    # Para cada venta, generamos algunos detalles
+    num_items = rng.integers(
+        1, NUM_VENTAS_DETALLE_PER_VENTA * 2, n, endpoint=True
+    )  # Cantidad variable de ítems por venta
+    m = int(num_items.sum())
+    vd_ventas_ids = np.repeat(venta_ids, num_items)
+    # Productos existentes
+    prod_ids = rng.integers(1, config.productos, m, endpoint=True)
+    cantidades = rng.integers(1, 10, m, endpoint=True)
+    precios_cents = PRECIOS[prod_ids].astype(np.int64)  # Precio real del producto
+    precios = precios_cents / 100
+    costos = (precios * rng.uniform(0.5, 0.8, m)).round(2)  # Costo simulado
+    detalles = (vd_ventas_ids, prod_ids, cantidades, precios, costos)
+
+    # Neto = suma de cantidad * precio de los detalles de cada venta, en centavos
+    # para que la suma sea exacta. Toda venta tiene al menos un ítem, así que
+    # reduceat() no encuentra segmentos vacíos.
+    inicios = np.concatenate(([0], np.cumsum(num_items)[:-1]))
+    neto = np.add.reduceat(cantidades * precios_cents, inicios) / 100
+    iva = (neto * 0.21).round(2)  # Asumiendo un 21% de IVA
+    total = (neto + iva).round(2)
+    ventas = (venta_ids, fechas, cli_ids, nro_facturas, neto, iva, total)
+
+    return ventas, detalles
+
+
+def _valores_unicos(funcion, n):
+    """Llama a ``funcion`` hasta reunir ``n`` valores distintos (o agotar los intentos).
+
+    Algunos proveedores, como ``color_name``, tienen menos de ``n`` valores posibles.
+    """
+    valores = {}  # dict en lugar de set: conserva el orden y el pool es reproducible
+    for _ in range(n * 10):
+        if len(valores) == n:
+            break
+        valores[funcion()] = None
+    return list(valores)
+
+
+def cargar_nombres(directorio, seed, size=POOL_SIZE):
+    """Carga los pools de nombres desde ``directorio`` o los genera la primera vez.
+
+    El archivo, JSON comprimido con gzip, se identifica por locale, semilla y
+    tamaño; las siguientes ejecuciones lo reutilizan sin llamar a Faker.
+    """
+    path = Path(directorio) / f"nombres_{LOCALE}_{seed}_{size}.json.gz"
+    if path.exists():
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    fake.seed_instance(seed)
+    nombres = {
+        proveedor: _valores_unicos(getattr(fake, proveedor), size)
+        for proveedor in PROVEEDORES_FAKER
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(nombres, f, ensure_ascii=False, separators=(",", ":"))
+    tmp_path.replace(path)  # Reemplazo atómico: nunca queda un pool a medio escribir
+    return nombres
+
+
+def _inicializar_worker(nombres, precios):
+    global NOMBRES, PRECIOS
+    NOMBRES = nombres
+    PRECIOS = precios
+
+
+GENERADORES = {
+    "proveedores": generar_proveedores,
+    "clientes": generar_clientes,
+    "productos": generar_productos,
+    "ventas": generar_ventas,
+}
+
+
+def generar_fragmento(tarea):
+    """Genera un fragmento ``(tabla, start, stop, config)``; se ejecuta en el pool."""
+    table, start, stop, config = tarea
+    seed = semilla(config.seed, table, start)
+    fake.seed_instance(seed)
+    return GENERADORES[table](random.Random(seed), start, stop, config)
+
+
+def fragmentos(table, total, config, primer_id=1):
+    stop = primer_id + total
+    for start in range(primer_id, stop, config.chunk_size):
+        yield (table, start, min(start + config.chunk_size, stop), config)
+
+
+def generar_tablas(config, workers, nombres=None):
+    """Genera ``(tabla, filas)`` en orden de IDs y de dependencia entre tablas.
+
+    Primero se generan las tablas del catálogo, construyendo de paso el índice
+    de precios de los productos; después, las ventas con un pool que ya lo tiene.
+    Las ventas y sus detalles se emiten intercalados, fragmento a fragmento,
+    para no tener que retener todos los detalles en memoria.
+    """
+    catalogo = [
+        *fragmentos("proveedores", config.proveedores, config),
+        *fragmentos("clientes", config.clientes, config),
+        *fragmentos("productos", config.productos, config),
+    ]
+    precios = np.zeros(config.productos + 1, dtype=np.int32)  # 4 bytes por producto
+    for (table, start, stop, _), filas in zip(
+        catalogo, _ejecutar(catalogo, workers, nombres, None)
+    ):
+        if table == "productos":
+            precios[start:stop] = (np.array([fila[4] for fila in filas]) * 100).round()
+        yield table, filas
+
+    yield from generar_ventas_y_detalles(config, workers, nombres, precios)
+
+
+def generar_ventas_y_detalles(config, workers, nombres, precios, venta_id=1, vd_id=1):
+    """Genera ``config.ventas`` ventas a partir de ``venta_id`` y sus detalles."""
+    tareas = list(fragmentos("ventas", config.ventas, config, venta_id))
+    for ventas, detalles in _ejecutar(tareas, workers, nombres, precios):
+        vd_ids = np.arange(vd_id, vd_id + len(detalles[0]))
+        yield "ventas", Columnas(ventas)
+        yield "ventas_detalle", Columnas((vd_ids, *detalles))
+        vd_id += len(vd_ids)
+
+
+def _ejecutar(tareas, workers, nombres, precios):
+    """Genera los fragmentos de ``tareas`` y devuelve los resultados en orden."""
+    if workers > 1:
+        with Pool(workers, _inicializar_worker, (nombres, precios)) as pool:
+            # imap() devuelve los resultados en el orden de las tareas
+            yield from pool.imap(generar_fragmento, tareas)
+    else:
+        _inicializar_worker(nombres, precios)
+        yield from map(generar_fragmento, tareas)
+
+
+def sentencias(script):
+    """Divide un script SQL sin literales con ';' en sentencias individuales."""
+    return [sentencia for sentencia in script.split(";") if sentencia.strip()]
+
+
+def generar_sql(writer, config, workers, nombres=None, indices=True):
+    # --- Encabezado del archivo SQL ---
+    writer.write("-- SQL generado para SQLite")
+    writer.write(
+        "-- Habilitar la verificación de claves foráneas (importante para SQLite)"
     )
-print()
-
-print("-- 4.2. Insertando datos en 'clientes'")
-for i in range(1, NUM_CLIENTES + 1):
-    cliente_ids.append(i)
-    razon_social = fake.company().replace("'", "''")
-    print(
-        f'INSERT INTO "clientes" ("Cli_Id", "Cli_RazonSocial") VALUES ({i}, \'{razon_social}\');'
+    writer.write("PRAGMA foreign_keys = ON;")
+    writer.write()
+
+    # --- INICIAR UNA TRANSACCIÓN GRANDE AQUÍ para una importación más rápida ---
+    writer.write("BEGIN TRANSACTION;")
+    writer.write()
+
+    # --- DROP TABLES (en orden inverso de dependencia para asegurar que no haya errores de FK) ---
+    writer.write("-- 1. DROP TABLES")
+    for table in reversed(TABLES):
+        writer.write(f'DROP TABLE IF EXISTS "{table}";')
+    writer.write()
+
+    # --- CREATE TABLES (en orden de dependencia) ---
+    writer.write("-- 2. CREATE TABLES")
+    writer.write(SCHEMA)
+    writer.write()
+
+    # --- 3. INSERT DATA (¡EN ESTE ORDEN PARA RESPETAR LAS CLAVES FORÁNEAS!) ---
+    writer.write("-- 3. INSERT DATA")
+    for table, filas in generar_tablas(config, workers, nombres):
+        writer.insert(table, COLUMNS[table], filas)
+    writer.write()
+
+    # --- 4. ÍNDICES Y ESTADÍSTICAS (después de insertar, no antes) ---
+    if indices:
+        writer.write("-- 4. CREATE INDEX")
+        writer.write(INDEXES)
+        writer.write("ANALYZE;")
+        writer.write()
+
+    # --- FINALIZAR LA TRANSACCIÓN AQUÍ ---
+    writer.write("COMMIT;")
+    writer.write()
+
+    writer.write("-- Fin de la generación de datos.")
+
+
+def cargar_sqlite(path, config, workers, nombres=None, indices=True):
+    """Recrea el esquema en ``path`` y carga todas las tablas en una transacción."""
+    # isolation_level=None: controlamos la transacción manualmente
+    connection = sqlite3.connect(path, isolation_level=None)
+    try:
+        for pragma, value in LOAD_PRAGMAS.items():
+            connection.execute(f"PRAGMA {pragma} = {value}")
+
+        connection.execute("BEGIN")
+        for table in reversed(TABLES):
+            connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+        # executescript() haría COMMIT implícito; ejecutamos sentencia a sentencia
+        for statement in sentencias(SCHEMA):
+            connection.execute(statement)
+
+        loader = SQLiteLoader(connection)
+        for table, filas in generar_tablas(config, workers, nombres):
+            loader.insert(table, COLUMNS[table], filas)
+
+        if indices:
+            for statement in sentencias(INDEXES):
+                connection.execute(statement)
+            connection.execute("ANALYZE")
+        connection.execute("COMMIT")
+
+        for pragma, value in DEFAULT_PRAGMAS.items():
+            connection.execute(f"PRAGMA {pragma} = {value}")
+    finally:
+        connection.close()
+
+
+def exportar_columnas(directorio, config, workers, nombres=None):
+    """Escribe cada tabla en ``directorio`` con el formato de ``columnar.py``."""
+    with ColumnarWriter(directorio) as writer:
+        for table, filas in generar_tablas(config, workers, nombres):
+            writer.insert(table, COLUMNS[table], filas)
+
+
+def anexar_sqlite(path, config, workers, nombres=None, indices=True):
+    """Agrega ``config.ventas`` ventas (y sus detalles) a una base ya cargada.
+
+    Continúa desde los IDs máximos actuales y toma clientes y precios de los
+    productos existentes, así que no regenera ni reescribe el resto de tablas.
+    Se asume que los IDs de clientes y productos son consecutivos desde 1,
+    como los deja este generador.
+    """
+    connection = sqlite3.connect(path, isolation_level=None)
+    try:
+        for pragma, value in APPEND_PRAGMAS.items():
+            connection.execute(f"PRAGMA {pragma} = {value}")
+
+        connection.execute("BEGIN")
+        (venta_id,) = connection.execute(
+            'SELECT COALESCE(MAX("Ventas_Id"), 0) + 1 FROM "ventas"'
+        ).fetchone()
+        (vd_id,) = connection.execute(
+            'SELECT COALESCE(MAX("VD_Id"), 0) + 1 FROM "ventas_detalle"'
+        ).fetchone()
+        (clientes,) = connection.execute(
+            'SELECT COALESCE(MAX("Cli_Id"), 0) FROM "clientes"'
+        ).fetchone()
+        productos = connection.execute(
+            'SELECT "Prod_Id", "Prod_Precio" FROM "productos"'
+        ).fetchall()
+        if not clientes or not productos:
+            raise ValueError(f"{path} no tiene clientes o productos para anexar ventas")
+
+        prod_ids, prod_precios = np.array(productos).T
+        precios = np.zeros(int(prod_ids.max()) + 1, dtype=np.int32)
+        precios[prod_ids.astype(np.int64)] = (prod_precios * 100).round()
+        config = replace(config, clientes=clientes, productos=len(precios) - 1)
+
+        loader = SQLiteLoader(connection)
+        for table, filas in generar_ventas_y_detalles(
+            config, workers, nombres, precios, venta_id, vd_id
+        ):
+            loader.insert(table, COLUMNS[table], filas)
+
+        if indices:
+            for statement in sentencias(INDEXES):
+                connection.execute(statement)
+            connection.execute("PRAGMA analysis_limit = 1000")  # ANALYZE aproximado
+            connection.execute("ANALYZE")
+        connection.execute("COMMIT")
+
+        for pragma, value in DEFAULT_PRAGMAS.items():
+            connection.execute(f"PRAGMA {pragma} = {value}")
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Genera datos falsos para la base de datos del curso de SQL."
     )
-print()
-
-print("-- 4.3. Insertando datos en 'productos'")
-for i in range(1, NUM_PRODUCTOS + 1):
-    producto_ids.append(i)
-    descripcion = fake.catch_phrase().replace("'", "''")
-    color = fake.color_name().replace("'", "''")
-    status = random.choice([0, 1])
-    precio = round(random.uniform(5.0, 500.0), 2)
-    prov_id = random.choice(proveedor_ids)  # Selecciona un proveedor existente
-    print(
-        f'INSERT INTO "productos" ("Prod_Id", "Prod_Descripcion", "Prod_Color", "Prod_Status", "Prod_Precio", "Prod_ProvId") VALUES ({i}, \'{descripcion}\', \'{color}\', {status}, {precio:.2f}, {prov_id});'
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Archivo SQL de salida (por defecto, la salida estándar)",
     )
-print()
-
-print("-- 4.4. Insertando datos en 'ventas'")
-start_date = date(2023, 1, 1)
-end_date = date(2024, 12, 31)
-time_delta = (end_date - start_date).days
-
-for i in range(1, NUM_VENTAS + 1):
-    venta_ids.append(i)
-    fecha = start_date + timedelta(days=random.randint(0, time_delta))
-    cli_id = random.choice(cliente_ids)  # Selecciona un cliente existente
-    nro_factura = random.randint(1000, 9999)
-    neto = round(random.uniform(10.0, 2000.0), 2)
-    iva = round(neto * 0.21, 2)  # Asumiendo un 21% de IVA
-    total = round(neto + iva, 2)
-    print(
-        f'INSERT INTO "ventas" ("Ventas_Id", "Ventas_Fecha", "Ventas_CliId", "Ventas_NroFactura", "Ventas_Neto", "Ventas_Iva", "Ventas_Total") VALUES ({i}, \'{fecha}\', {cli_id}, {nro_factura}, {neto:.2f}, {iva:.2f}, {total:.2f});'
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"Filas por sentencia INSERT (por defecto, {BATCH_SIZE})",
     )
-print()
-
-print("-- 4.5. Insertando datos en 'ventas_detalle'")
-# Para cada venta, generamos algunos detalles
-detalle_id_counter = 1
-for venta_id in venta_ids:
-    num_items = random.randint(
-        1, NUM_VENTAS_DETALLE_PER_VENTA * 2
-    )  # Cantidad variable de ítems por venta
-    for _ in range(num_items):
-        prod_id = random.choice(producto_ids)  # Selecciona un producto existente
-        cantidad = random.randint(1, 10)
-        # Aquí, idealmente, buscaríamos el precio real del producto,
-        # pero para datos falsos, podemos simularlo o simplemente usar un valor aleatorio
-        precio_unitario = round(
-            random.uniform(5.0, 500.0), 2
-        )  # Precio del ítem en la venta
-        costo_unitario = round(
-            precio_unitario * random.uniform(0.5, 0.8), 2
-        )  # Costo simulado
-        print(
-            f'INSERT INTO "ventas_detalle" ("VD_Id", "VD_VentasId", "VD_ProdId", "VD_Cantidad", "VD_Precio", "VD_Costo") VALUES ({detalle_id_counter}, {venta_id}, {prod_id}, {cantidad}, {precio_unitario:.2f}, {costo_unitario:.2f});'
-        )
-        detalle_id_counter += 1
-print()
+    parser.add_argument(
+        "--direct",
+        metavar="DB",
+        help="Carga los datos directamente en la base SQLite indicada (p. ej. db/course.db)",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PERFILES,
+        default="small",
+        help="Cantidades de registros predefinidas (por defecto, small)",
+    )
+    # Las cantidades explícitas tienen prioridad sobre las del perfil
+    parser.add_argument(
+        "--columnar",
+        metavar="DIR",
+        help="Exporta cada tabla como columnas binarias mapeables en memoria (ver columnar.py)",
+    )
+    parser.add_argument("--proveedores", type=int)
+    parser.add_argument("--clientes", type=int)
+    parser.add_argument("--productos", type=int)
+    parser.add_argument("--ventas", type=int)
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="Con --direct, agrega sólo ventas y detalles nuevos a la base existente",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=SEED,
+        help=f"Semilla maestra (por defecto, {SEED})",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"IDs por fragmento (por defecto, {CHUNK_SIZE}); cambiarlo cambia los datos",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Procesos para generar los fragmentos (por defecto, uno por núcleo)",
+    )
+    parser.add_argument(
+        "--name-pool",
+        metavar="DIR",
+        help="Muestrea nombres de pools guardados en DIR en lugar de llamar a Faker en cada fila",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=POOL_SIZE,
+        help=f"Valores únicos por proveedor de Faker en cada pool (por defecto, {POOL_SIZE})",
+    )
+    parser.add_argument(
+        "--no-indexes",
+        dest="indices",
+        action="store_false",
+        help="No crea índices ni ejecuta ANALYZE (para medir sólo la escritura)",
+    )
+    args = parser.parse_args()
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size debe ser al menos 1")
+    if args.append and not args.direct:
+        parser.error("--append requiere --direct")
+    if args.columnar and (args.direct or args.output):
+        parser.error("--columnar no se combina con --direct ni con --output")
+
+    cantidades = dict(
+        zip(("proveedores", "clientes", "productos", "ventas"), PERFILES[args.profile])
+    )
+    for table in cantidades:
+        if getattr(args, table) is not None:
+            cantidades[table] = getattr(args, table)
+    config = Configuracion(**cantidades, seed=args.seed, chunk_size=args.chunk_size)
+
+    nombres = None
+    if args.name_pool:
+        nombres = cargar_nombres(args.name_pool, args.seed, args.pool_size)
+
+    if args.columnar:
+        exportar_columnas(args.columnar, config, args.workers, nombres)
+    elif args.append:
+        anexar_sqlite(args.direct, config, args.workers, nombres, args.indices)
+    elif args.direct:
+        cargar_sqlite(args.direct, config, args.workers, nombres, args.indices)
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+            writer = SQLWriter(f, args.batch_size)
+            generar_sql(writer, config, args.workers, nombres, args.indices)
+    else:
+        writer = SQLWriter(sys.stdout, args.batch_size)
+        generar_sql(writer, config, args.workers, nombres, args.indices)
 
-# --- FINALIZAR LA TRANSACCIÓN AQUÍ ---
-print("COMMIT;")  # <--- AÑADIDA PARA UNA IMPORTACIÓN MÁS RÁPIDA
-print()
 
-print("-- Fin de la generación de datos.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Delete stored files in the background once the transaction commits.
+
+``delete_after_commit`` hands file names to a ``FileDeletionQueue``, whose
+worker thread deletes them without blocking the request. Names queued
+together for the same storage are deleted as one batch:
+
+- S3 storages (anything with a boto3 ``bucket``) get one ``delete_objects``
+  request per ``batch_size`` keys.
+- Any other storage, e.g. the local filesystem, gets ``storage.delete`` for
+  each name, which never needs ``.path``.
+
+Files that could not be deleted are retried with exponential backoff, then
+logged. If the worker thread cannot start, e.g. while the interpreter exits,
+the files are deleted inline instead.
+"""
+
+import atexit
+import logging
+import posixpath
+import queue
+import threading
+import time
+from functools import cache, partial
+
+from django.conf import settings
+from django.db import transaction
+
+try:
+    from storages.utils import clean_name
+except ImportError:  # django-storages is optional, S3 storages need it
+    clean_name = None
+
+logger = logging.getLogger(__name__)
+
+
+def _shutting_down():
+    """Return True once the interpreter exits: no new thread can start then."""
+    return not threading.main_thread().is_alive()
+
+
+def bucket_key(storage, name):
+    """Return the S3 key of ``name``, as ``S3Storage.delete`` would compute it."""
+    if clean_name is not None and hasattr(storage, "_normalize_name"):
+        return storage._normalize_name(clean_name(name))
+    return posixpath.join(storage.location, name) if storage.location else name
+
+
+def delete_from_bucket(storage, names, batch_size=1000):
+    """Delete ``names`` with S3 multi-object deletes; return the ones that failed."""
+    keys = {bucket_key(storage, name): name for name in names}
+    batches = [list(keys)[i : i + batch_size] for i in range(0, len(keys), batch_size)]
+
+    failed = []
+    for batch in batches:
+        try:
+            response = storage.bucket.delete_objects(
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+            )
+        except Exception:
+            logger.warning("Could not delete %d objects", len(batch), exc_info=True)
+            failed.extend(keys[key] for key in batch)
+        else:
+            failed.extend(keys[error["Key"]] for error in response.get("Errors", []))
+    return failed
+
+
+def delete_each(storage, names):
+    """Delete ``names`` one at a time; return the ones that failed."""
+    failed = []
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.warning("Could not delete %s", name, exc_info=True)
+            failed.append(name)
+    return failed
+
+
+class FileDeletionQueue:
+    def __init__(self, batch_size=1000, retries=3, backoff=0.5):
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def delete(self, storage, names):
+        """Queue ``names`` for deletion from ``storage``.
+
+        If the worker thread cannot be started, the files are deleted right away.
+        """
+        with self._lock:
+            started = self._thread is not None or self._start_thread()
+        if started:
+            self._queue.put((storage, list(names)))
+        else:
+            logger.warning("File deletion thread unavailable, deleting inline")
+            self.delete_now(storage, names)
+
+    def _start_thread(self):
+        """Start the worker thread; return False if none can be started."""
+        if _shutting_down():
+            return False
+        thread = threading.Thread(target=self._run, name="file-deletion", daemon=True)
+        try:
+            thread.start()
+        except RuntimeError:  # e.g. "can't create new thread at interpreter shutdown"
+            return False
+        self._thread = thread  # Only published once it runs, see flush()
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until every queued file is deleted or given up on.
+
+        Returns False if that took longer than ``timeout`` seconds.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _next_batches(self):
+        """Wait for a request, then group it with the queued ones by storage.
+
+        Returns the batches and the flush events queued among the requests.
+        """
+        requests = [self._queue.get()]
+        while True:
+            try:
+                requests.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        batches = {}  # id(storage) -> (storage, names)
+        flushed = []
+        for request in requests:
+            if isinstance(request, threading.Event):
+                flushed.append(request)
+            else:
+                storage, names = request
+                batches.setdefault(id(storage), (storage, []))[1].extend(names)
+        return list(batches.values()), flushed
+
+    def _run(self):
+        while True:
+            batches, flushed = self._next_batches()
+            try:
+                for storage, names in batches:
+                    self.delete_now(storage, names)
+            except Exception:
+                logger.exception("File deletion failed")
+            finally:
+                for done in flushed:
+                    done.set()
+
+    def delete_now(self, storage, names):
+        """Delete ``names`` from ``storage``, retrying the ones that fail."""
+        pending = list(names)
+        for attempt in range(self.retries + 1):
+            if hasattr(storage, "bucket"):
+                pending = delete_from_bucket(storage, pending, self.batch_size)
+            else:
+                pending = delete_each(storage, pending)
+            if not pending:
+                return
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2**attempt)
+
+        logger.error("Giving up on deleting %d files: %s", len(pending), pending)
+
+
+@cache
+def get_deletion_queue():
+    """Return the process-wide queue, configured by the ``FILE_DELETE_*`` settings."""
+    deletion_queue = FileDeletionQueue(
+        batch_size=getattr(settings, "FILE_DELETE_BATCH_SIZE", 1000),
+        retries=getattr(settings, "FILE_DELETE_RETRIES", 3),
+        backoff=getattr(settings, "FILE_DELETE_RETRY_BACKOFF", 0.5),
+    )
+    # Do not leave files behind on shutdown, but do not hang the exit either
+    atexit.register(
+        deletion_queue.flush, getattr(settings, "FILE_DELETE_SHUTDOWN_TIMEOUT", 10)
+    )
+    return deletion_queue
+
+
+def _delete(storage, names):
+    get_deletion_queue().delete(storage, names)
+
+
+def delete_after_commit(storage, names, using=None):
+    """Delete ``names`` from ``storage`` in the background after the commit."""
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(partial(_delete, storage, names), using=using)
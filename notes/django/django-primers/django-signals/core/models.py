@@ -1,6 +1,15 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as BaseUserManager
 from django.db import models
 
+from core.bulk import BulkSignalsQuerySet
+
+
+class UserManager(BaseUserManager.from_queryset(BulkSignalsQuerySet)):
+    pass
+
 
 class User(AbstractUser):
     cv = models.FileField(upload_to="cvs/", blank=True, null=True)
+
+    objects = UserManager()
@@ -1,9 +1,8 @@
-import os
-
-from django.core.mail import send_mail
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from core import cleanup, tasks
+from core.bulk import in_bulk_delete, post_bulk_create, post_bulk_delete
 from core.models import User
 
 
@@ -14,19 +13,37 @@ def send_welcome_email(sender, instance, created, **kwargs):
     print("> Signal fired...")
 
     if created:
-        subject = "Welcome"
-        message = "Thank you for signing up"
-        from_email = "admin@django.com"
-        recipient_list = [instance.email]
+        # Sent in the background once the signup is committed
+        tasks.enqueue(tasks.send_welcome_email, instance.email)
+
+
+@receiver(post_bulk_create, sender=User, dispatch_uid="send_welcome_emails")
+def send_welcome_emails(
+    sender, instances, ignore_conflicts=False, update_conflicts=False, **kwargs
+):
+    """Sends the welcome email to every user created by ``bulk_create``."""
+
+    if ignore_conflicts or update_conflicts:
+        return  # Existing users cannot be told apart from new ones
 
-        send_mail(subject, message, from_email, recipient_list)
+    emails = [user.email for user in instances if user.email]
+    if emails:
+        # One background task and one mail connection for the whole batch
+        tasks.enqueue(tasks.send_welcome_emails, emails)
 
 
 @receiver(post_delete, sender=User, dispatch_uid="delete_associated_file")
 def delete_associated_file(sender, instance, **kwargs):
-    """Deletes the associated file from the filesystem when a User instance is deleted."""
+    """Deletes the associated file from storage when a User instance is deleted."""
+
+    if not in_bulk_delete(sender):  # The batch receiver gets the whole bulk delete
+        delete_associated_files(sender, [instance], **kwargs)
+
+
+@receiver(post_bulk_delete, sender=User, dispatch_uid="delete_associated_files")
+def delete_associated_files(sender, instances, using=None, **kwargs):
+    """Deletes the associated files of deleted Users once the delete commits."""
 
-    if instance.cv:
-        if os.path.isfile(instance.cv.path):
-            os.remove(instance.cv.path)
-            print(f"> Deleted file: {instance.cv.path}")
+    storage = sender._meta.get_field("cv").storage
+    names = [instance.cv.name for instance in instances if instance.cv]
+    cleanup.delete_after_commit(storage, names, using=using)
@@ -0,0 +1,95 @@
+"""Background tasks of the core app.
+
+``enqueue`` runs a task once the current transaction commits, so a rolled back
+signup never sends an email and a failing email never rolls back a signup.
+Tasks go to Celery when it is installed and ``CELERY_BROKER_URL`` is set, and
+to an in-process thread pool otherwise (or if the broker cannot be reached).
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, partial
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.db import transaction
+
+try:
+    from celery import shared_task
+except ImportError:
+    shared_task = None
+
+logger = logging.getLogger(__name__)
+
+
+def task(**options):
+    """Register the function as a Celery task when Celery is available."""
+
+    def decorator(func):
+        return shared_task(**options)(func) if shared_task else func
+
+    return decorator
+
+
+def use_celery():
+    broker_url = getattr(settings, "CELERY_BROKER_URL", None)
+    return shared_task is not None and bool(broker_url)
+
+
+@cache
+def get_executor():
+    """Return the thread pool used when there is no broker."""
+    return ThreadPoolExecutor(
+        getattr(settings, "TASKS_THREAD_POOL_SIZE", 4), thread_name_prefix="tasks"
+    )
+
+
+def _run(func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background task %s failed", func.__name__)
+
+
+def _dispatch(func, args):
+    if use_celery():
+        try:
+            func.delay(*args)
+            return
+        except Exception:
+            logger.exception("Could not queue %s, running it here", func.__name__)
+    try:
+        get_executor().submit(_run, func, args)
+    except RuntimeError:
+        # The interpreter is exiting and the pool takes no more work
+        _run(func, args)
+
+
+def enqueue(func, *args, using=None):
+    """Run ``func(*args)`` in the background after the transaction commits."""
+    transaction.on_commit(partial(_dispatch, func, args), using=using)
+
+
+@task(autoretry_for=(OSError,), retry_backoff=True, max_retries=3)
+def send_welcome_email(email):
+    """Sends the welcome email to a new user."""
+
+    subject = "Welcome"
+    message = "Thank you for signing up"
+    from_email = "admin@django.com"
+    recipient_list = [email]
+
+    send_mail(subject, message, from_email, recipient_list)
+
+
+@task(autoretry_for=(OSError,), retry_backoff=True, max_retries=3)
+def send_welcome_emails(emails):
+    """Sends the welcome email to a batch of new users over one connection."""
+
+    messages = [
+        EmailMessage("Welcome", "Thank you for signing up", "admin@django.com", [email])
+        for email in emails
+    ]
+
+    with get_connection() as connection:
+        connection.send_messages(messages)
@@ -1,3 +1,464 @@
-from django.test import TestCase
+import logging
+import tempfile
+import threading
+import time
+from pathlib import Path
+from smtplib import SMTPException
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage, default_storage
+from django.db.models.signals import post_delete
+from django.test import TestCase, override_settings, tag
+
+from core import cleanup, tasks
+from core.bulk import in_bulk_delete, post_bulk_create, post_bulk_delete
+from core.models import User
+from project import celery_app
+
+try:
+    from moto.server import ThreadedMotoServer
+    from storages.backends.s3 import S3Storage
+except ImportError:  # Needed by the S3 tests only
+    ThreadedMotoServer = S3Storage = None
+
+
+def wait_for_tasks():
+    """Wait for the tasks submitted to the fallback thread pool."""
+    tasks.get_executor().shutdown(wait=True)
+    tasks.get_executor.cache_clear()
+
+
+def wait_for_deletions():
+    """Wait for the files queued for deletion."""
+    cleanup.get_deletion_queue().flush()
+
+
+class WelcomeEmailTests(TestCase):
+    def test_email_sent_after_commit(self):
+        """Tests that the welcome email is sent in the background after commit."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            User.objects.create_user(username="test", email="test@example.com")
+        self.assertEqual(len(mail.outbox), 0)  # Nothing sent inside the transaction
+
+        for callback in callbacks:
+            callback()
+        wait_for_tasks()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["test@example.com"])
+
+    def test_no_email_on_update(self):
+        """Tests that updating a user does not queue another email."""
+        user = User.objects.create_user(username="test", email="test@example.com")
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.first_name = "Test"
+            user.save()
+
+        self.assertEqual(callbacks, [])
+
+    @patch("core.tasks.send_mail", side_effect=SMTPException("Connection refused"))
+    def test_mail_failure_does_not_break_signup(self, mock_send_mail):
+        """Tests that a mail server error is logged instead of failing the signup."""
+        with self.assertLogs("core.tasks", level="ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                User.objects.create_user(username="test", email="test@example.com")
+            wait_for_tasks()
+
+        self.assertTrue(User.objects.filter(username="test").exists())
+
+    def test_email_sent_inline_once_the_pool_is_shut_down(self):
+        """Tests that a task still runs when the pool no longer takes work."""
+        tasks.get_executor().shutdown()
+        self.addCleanup(tasks.get_executor.cache_clear)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username="test", email="test@example.com")
+
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class BulkSignalsTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+    def receive(self, signal):
+        """Return the list of the ``instances`` sent with each ``signal``."""
+        batches = []
+
+        def receiver(sender, instances, **kwargs):
+            batches.append(instances)
+
+        signal.connect(receiver, sender=User, weak=False)
+        self.addCleanup(signal.disconnect, receiver, sender=User)
+        return batches
+
+    def create_user_with_cv(self, username):
+        user = User(username=username, email=f"{username}@example.com")
+        user.cv.save(f"{username}.pdf", ContentFile(b"CV"))  # Also saves the user
+        return user
+
+    def test_bulk_create_sends_one_batch_of_emails(self):
+        """Tests that bulk_create queues a single task that emails every new user."""
+        batches = self.receive(post_bulk_create)
+        users = [
+            User(username=f"user{n}", email=f"user{n}@example.com") for n in range(3)
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            User.objects.bulk_create(users)
+        wait_for_tasks()
+
+        self.assertEqual(batches, [users])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            sorted(email.to[0] for email in mail.outbox),
+            [f"user{n}@example.com" for n in range(3)],
+        )
+
+    def test_queryset_delete_removes_files_in_one_batch(self):
+        """Tests that a queryset delete sends one batch and removes every CV."""
+        users = [self.create_user_with_cv(f"user{n}") for n in range(3)]
+        paths = [Path(user.cv.path) for user in users]
+        batches = self.receive(post_bulk_delete)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted, _ = User.objects.filter(username__startswith="user").delete()
+        wait_for_deletions()
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(
+            sorted(user.username for user in batches[0]), ["user0", "user1", "user2"]
+        )
+        self.assertFalse(any(path.exists() for path in paths))
+
+    def test_queryset_delete_skips_per_row_receiver(self):
+        """Tests that the post_delete receiver leaves bulk deletes to the batch one."""
+        for n in range(3):
+            self.create_user_with_cv(f"user{n}")
+
+        with patch("core.signals.delete_associated_files") as delete_files:
+            User.objects.all().delete()
+
+        delete_files.assert_not_called()  # No row was forwarded one at a time
+
+    def test_instance_delete_removes_file(self):
+        """Tests that deleting a single user still removes its CV."""
+        user = self.create_user_with_cv("test")
+        path = Path(user.cv.path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+        wait_for_deletions()
+
+        self.assertFalse(path.exists())
+
+    def test_no_emails_for_bulk_create_with_conflicts(self):
+        """Tests that bulk_create with a conflict mode does not email existing users."""
+        User.objects.create_user(username="existing", email="existing@example.com")
+        batches = self.receive(post_bulk_create)
+
+        for conflicts in ({"ignore_conflicts": True}, {"update_conflicts": True}):
+            with self.subTest(**conflicts):
+                options = conflicts | (
+                    {"unique_fields": ["username"], "update_fields": ["email"]}
+                    if "update_conflicts" in conflicts
+                    else {}
+                )
+                with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                    User.objects.bulk_create(
+                        [User(username="existing", email="existing@example.com")],
+                        **options,
+                    )
+                wait_for_tasks()
+
+                self.assertEqual(callbacks, [])
+                self.assertEqual(mail.outbox, [])
+        self.assertEqual(len(batches), 2)  # The signal is still sent
+
+    def test_bulk_delete_flag_is_scoped_to_the_model(self):
+        """Tests that rows deleted by cascade still get their own post_delete."""
+        user = User.objects.create_user(username="test")
+        LogEntry.objects.log_actions(user.pk, [user], ADDITION)
+        flags = []
+
+        def receiver(sender, **kwargs):
+            flags.append((in_bulk_delete(sender), in_bulk_delete(User)))
+
+        post_delete.connect(receiver, sender=LogEntry, weak=False)
+        self.addCleanup(post_delete.disconnect, receiver, sender=LogEntry)
+        User.objects.all().delete()
+
+        self.assertEqual(flags, [(False, True)])
+
+
+class FakeBucket:
+    """Records ``delete_objects`` requests like a boto3 S3 bucket would serve them.
+
+    ``failures`` maps a key to the number of requests that report it as an error.
+    """
+
+    def __init__(self, keys=()):
+        self.keys = set(keys)
+        self.requests = []
+        self.failures = {}
+
+    def delete_objects(self, Delete):
+        keys = [obj["Key"] for obj in Delete["Objects"]]
+        self.requests.append(keys)
+
+        errors = []
+        for key in keys:
+            if self.failures.get(key):
+                self.failures[key] -= 1
+                errors.append({"Key": key, "Code": "InternalError"})
+            else:
+                self.keys.discard(key)
+        return {"Errors": errors} if errors else {}
+
+
+class S3StubStorage(Storage):
+    """Stands in for django-storages' S3Storage; only the bucket is used."""
+
+    location = "media"
+    bucket = FakeBucket()
+
+
+@override_settings(FILE_DELETE_RETRY_BACKOFF=0)
+class FileCleanupTests(TestCase):
+    def setUp(self):
+        cleanup.get_deletion_queue.cache_clear()
+        self.addCleanup(wait_for_deletions)
+
+    def stub_bucket(self, keys):
+        """Give ``S3StubStorage`` a new bucket holding ``keys`` for this test."""
+        patcher = patch.object(S3StubStorage, "bucket", FakeBucket(keys))
+        self.addCleanup(patcher.stop)
+        self.addCleanup(wait_for_deletions)  # Runs first: keep the bucket until done
+        return patcher.start()
+
+    def test_local_file_deleted_after_commit(self):
+        """Tests that the CV stays on disk until the delete commits."""
+        with (
+            tempfile.TemporaryDirectory() as media_root,
+            override_settings(MEDIA_ROOT=media_root),
+        ):
+            user = User(username="test")
+            user.cv.save("test.pdf", ContentFile(b"CV"))
+            path = Path(media_root) / user.cv.name
+
+            with self.captureOnCommitCallbacks() as callbacks:
+                user.delete()
+            wait_for_deletions()
+            self.assertTrue(path.exists())  # The transaction is still open
+
+            for callback in callbacks:
+                callback()
+            wait_for_deletions()
+            self.assertFalse(path.exists())
+
+    def test_local_failures_are_retried(self):
+        """Tests that a file that could not be removed is tried again."""
+        with patch.object(
+            default_storage, "delete", side_effect=[PermissionError, None]
+        ) as delete:
+            cleanup.get_deletion_queue().delete(default_storage, ["cvs/test.pdf"])
+            wait_for_deletions()
+
+        self.assertEqual(delete.call_count, 2)
+
+    def test_deletes_inline_when_no_thread_can_start(self):
+        """Tests that files are deleted right away if the thread cannot start."""
+        deletion_queue = cleanup.get_deletion_queue()
+        error = RuntimeError("can't create new thread at interpreter shutdown")
+
+        with (
+            patch.object(threading.Thread, "start", side_effect=error),
+            patch.object(default_storage, "delete") as delete,
+            self.assertLogs("core.cleanup", level="WARNING"),
+        ):
+            deletion_queue.delete(default_storage, ["cvs/test.pdf"])
+
+        delete.assert_called_once_with("cvs/test.pdf")
+        self.assertIsNone(deletion_queue._thread)
+
+    def test_deletes_inline_at_interpreter_exit(self):
+        """Tests that no thread is started once the main thread has finished."""
+        deletion_queue = cleanup.get_deletion_queue()
+
+        with (
+            patch("core.cleanup._shutting_down", return_value=True),
+            patch.object(default_storage, "delete") as delete,
+            self.assertLogs("core.cleanup", level="WARNING"),
+        ):
+            deletion_queue.delete(default_storage, ["cvs/test.pdf"])
+
+        delete.assert_called_once_with("cvs/test.pdf")
+        self.assertIsNone(deletion_queue._thread)
+
+    def test_flush_timeout(self):
+        """Tests that flush gives up waiting after ``timeout`` seconds."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        deletion_queue = cleanup.get_deletion_queue()
+
+        with patch.object(
+            default_storage, "delete", side_effect=lambda name: release.wait(5)
+        ):
+            deletion_queue.delete(default_storage, ["cvs/test.pdf"])
+
+            self.assertFalse(deletion_queue.flush(timeout=0.05))
+            release.set()
+            self.assertTrue(deletion_queue.flush(timeout=5))
+
+    @override_settings(
+        STORAGES={"default": {"BACKEND": "core.tests.S3StubStorage"}},
+        FILE_DELETE_BATCH_SIZE=2,
+    )
+    def test_s3_files_deleted_in_batches(self):
+        """Tests that a bulk delete sends one S3 request per batch of keys."""
+        keys = [f"media/cvs/user{n}.pdf" for n in range(3)]
+        bucket = self.stub_bucket(keys)
+        for n in range(3):
+            User.objects.create(username=f"user{n}", cv=f"cvs/user{n}.pdf")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.all().delete()
+        wait_for_deletions()
+
+        self.assertEqual(bucket.keys, set())
+        self.assertEqual(sorted(map(len, bucket.requests)), [1, 2])
+
+    @override_settings(STORAGES={"default": {"BACKEND": "core.tests.S3StubStorage"}})
+    def test_s3_errors_are_retried(self):
+        """Tests that only the keys S3 failed to delete are requested again."""
+        bucket = self.stub_bucket(["media/a.pdf", "media/b.pdf"])
+        bucket.failures["media/b.pdf"] = 1
+
+        cleanup.get_deletion_queue().delete(default_storage, ["a.pdf", "b.pdf"])
+        wait_for_deletions()
+
+        self.assertEqual(
+            bucket.requests, [["media/a.pdf", "media/b.pdf"], ["media/b.pdf"]]
+        )
+        self.assertEqual(bucket.keys, set())
+
+    @override_settings(
+        STORAGES={"default": {"BACKEND": "core.tests.S3StubStorage"}},
+        FILE_DELETE_RETRIES=2,
+    )
+    def test_gives_up_after_retries(self):
+        """Tests that a key that keeps failing is logged after the last retry."""
+        bucket = self.stub_bucket(["media/a.pdf"])
+        bucket.failures["media/a.pdf"] = 10
+
+        with self.assertLogs("core.cleanup", level="ERROR"):
+            cleanup.get_deletion_queue().delete(default_storage, ["a.pdf"])
+            wait_for_deletions()
+
+        self.assertEqual(len(bucket.requests), 3)
+        self.assertEqual(bucket.keys, {"media/a.pdf"})
+
+
+@tag("integration")
+@skipUnless(
+    ThreadedMotoServer, "moto[server] and django-storages[s3] are not installed"
+)
+@override_settings(FILE_DELETE_RETRY_BACKOFF=0)
+class S3FileCleanupTests(TestCase):
+    """Deletes files through boto3 and django-storages from a local S3 server."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        werkzeug = logging.getLogger("werkzeug")  # Logs every request to the server
+        cls.addClassCleanup(werkzeug.setLevel, werkzeug.level)
+        werkzeug.setLevel(logging.WARNING)
+
+        server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+        server.start()
+        cls.addClassCleanup(server.stop)
+        host, port = server.get_host_and_port()
+
+        cls.options = {
+            "bucket_name": "cvs",
+            "location": "media",
+            "endpoint_url": f"http://{host}:{port}",
+            "region_name": "us-east-1",
+            "access_key": "testing",
+            "secret_key": "testing",
+        }
+        S3Storage(**cls.options).bucket.create()
+
+    def setUp(self):
+        cleanup.get_deletion_queue.cache_clear()
+        self.addCleanup(wait_for_deletions)
+        storages = {"default": {"BACKEND": "storages.backends.s3.S3Storage"}}
+        storages["default"]["OPTIONS"] = self.options
+        self.enterContext(override_settings(STORAGES=storages))
+
+    def keys(self):
+        return {obj.key for obj in default_storage.bucket.objects.all()}
+
+    @override_settings(FILE_DELETE_BATCH_SIZE=2)
+    def test_files_deleted_in_batches(self):
+        """Tests that a bulk delete removes every CV from the bucket."""
+        for n in range(3):
+            user = User(username=f"user{n}")
+            user.cv.save(f"user{n}.pdf", ContentFile(b"CV"))
+        self.assertEqual(len(self.keys()), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.all().delete()
+        wait_for_deletions()
+
+        self.assertEqual(self.keys(), set())
+
+    def test_keys_are_normalized_by_the_storage(self):
+        """Tests that names are turned into keys the way django-storages does."""
+        default_storage.save("cvs/test.pdf", ContentFile(b"CV"))
+
+        cleanup.get_deletion_queue().delete(default_storage, ["cvs//test.pdf"])
+        wait_for_deletions()
+
+        self.assertEqual(self.keys(), set())
+
+
+@tag("integration")
+@skipUnless(celery_app, "Celery is not installed")
+@override_settings(CELERY_BROKER_URL="memory://")
+class CeleryWelcomeEmailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from celery.contrib.testing.worker import start_worker
+
+        celery_app.conf.update(
+            broker_url="memory://",
+            broker_transport_options={"polling_interval": 0.01},
+            result_backend="cache+memory://",
+        )
+        cls.enterClassContext(start_worker(celery_app, perform_ping_check=False))
+
+    def test_email_sent_by_worker(self):
+        """Tests that the welcome email goes through the broker to a Celery worker."""
+        task = tasks.send_welcome_email
+        with (
+            patch.object(task, "delay", wraps=task.delay) as delay,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            User.objects.create_user(username="test", email="test@example.com")
+
+        delay.assert_called_once_with("test@example.com")
+        deadline = time.monotonic() + 10
+        while not mail.outbox:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertEqual(mail.outbox[0].to, ["test@example.com"])
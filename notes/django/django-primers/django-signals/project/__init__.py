@@ -0,0 +1,6 @@
+try:
+    from project.celery import app as celery_app
+except ImportError:  # Celery is optional, tasks then run in a thread pool
+    celery_app = None
+
+__all__ = ("celery_app",)
@@ -0,0 +1,15 @@
+"""Celery application, used when Celery is installed and a broker is configured.
+
+Settings prefixed with ``CELERY_`` configure it (e.g. ``CELERY_BROKER_URL``).
+Start a worker with ``celery -A project worker``.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+app = Celery("project")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
@@ -129,3 +129,13 @@ EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "/media/"
+
+# Background tasks run on Celery when it is installed and a broker is set,
+# e.g. CELERY_BROKER_URL = "redis://localhost:6379/0", else in a thread pool
+TASKS_THREAD_POOL_SIZE = 4
+
+# CVs of deleted users are removed in the background after the commit
+FILE_DELETE_BATCH_SIZE = 1000  # Keys per S3 delete_objects request
+FILE_DELETE_RETRIES = 3
+FILE_DELETE_RETRY_BACKOFF = 0.5  # Seconds, doubled on every retry
+FILE_DELETE_SHUTDOWN_TIMEOUT = 10  # Seconds to wait for pending deletions at exit
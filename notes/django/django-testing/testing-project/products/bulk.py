@@ -0,0 +1,108 @@
+"""Signals for bulk operations.
+
+``bulk_create`` does not send ``post_save``, and ``QuerySet.delete`` sends one
+``post_delete`` per row. Models whose manager uses ``BulkSignalsQuerySet``
+also send, once per call:
+
+- ``post_bulk_create(sender, instances, using, ignore_conflicts,
+  update_conflicts)`` after ``bulk_create``. With either conflict flag set,
+  ``instances`` may include rows that already existed.
+- ``post_bulk_delete(sender, instances, using)`` after ``QuerySet.delete``.
+
+While a bulk delete runs, ``in_bulk_delete(sender)`` is True for the deleted
+model (not for the rows removed by cascade), so ``post_delete`` receivers that
+have a batch counterpart can skip the rows it will get.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import models
+from django.db.models.deletion import Collector
+from django.dispatch import Signal
+
+post_bulk_create = Signal()
+post_bulk_delete = Signal()
+
+_bulk_delete_models = ContextVar('bulk_delete_models', default=frozenset())
+
+
+def in_bulk_delete(model):
+    """Return True while ``post_delete`` is sent for the rows of a bulk delete."""
+    return model in _bulk_delete_models.get()
+
+
+@contextmanager
+def _deleting_in_bulk(model):
+    token = _bulk_delete_models.set(_bulk_delete_models.get() | {model})
+    try:
+        yield
+    finally:
+        _bulk_delete_models.reset(token)
+
+
+class BulkSignalsQuerySet(models.QuerySet):
+    def bulk_create(
+        self,
+        objs,
+        batch_size=None,
+        ignore_conflicts=False,
+        update_conflicts=False,
+        update_fields=None,
+        unique_fields=None,
+    ):
+        objs = super().bulk_create(
+            objs,
+            batch_size=batch_size,
+            ignore_conflicts=ignore_conflicts,
+            update_conflicts=update_conflicts,
+            update_fields=update_fields,
+            unique_fields=unique_fields,
+        )
+        if objs:
+            post_bulk_create.send(
+                sender=self.model,
+                instances=objs,
+                using=self.db,
+                ignore_conflicts=ignore_conflicts,
+                update_conflicts=update_conflicts,
+            )
+        return objs
+
+    bulk_create.alters_data = True
+
+    def delete(self):
+        """Delete the rows and send ``post_bulk_delete`` with all of them.
+
+        The rows are loaded once and handed to the deletion collector, as
+        ``QuerySet.delete`` would do to send ``post_delete``.
+        """
+        self._not_support_combined_queries('delete')
+        if self.query.is_sliced:
+            raise TypeError("Cannot use 'limit' or 'offset' with delete().")
+        if self.query.distinct_fields:
+            raise TypeError('Cannot call delete() after .distinct(*fields).')
+        if self._fields is not None:
+            raise TypeError('Cannot call delete() after .values() or .values_list()')
+
+        del_query = self._chain()
+        del_query._for_write = True
+        del_query.query.select_for_update = False
+        del_query.query.select_related = False
+        del_query.query.clear_ordering(force=True)
+        instances = list(del_query)
+
+        collector = Collector(using=del_query.db, origin=self)
+        collector.collect(instances)
+        with _deleting_in_bulk(self.model):
+            deleted = collector.delete()
+
+        self._result_cache = None
+        if instances:
+            post_bulk_delete.send(
+                sender=self.model, instances=instances, using=del_query.db
+            )
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+CATALOG_VERSION_KEY = 'products:catalog-version'
+
+
+def get_cache_alias():
+    return getattr(settings, 'PRODUCTS_CACHE_ALIAS', 'default')
+
+
+def _initial_version():
+    # Start from the current time rather than 1, so that if the version key is
+    # evicted, fragments cached under older versions are never served again.
+    return time.time_ns()
+
+
+def get_catalog_version():
+    """Return the current catalog version, used as part of cached fragment keys."""
+    cache = caches[get_cache_alias()]
+    return cache.get_or_set(CATALOG_VERSION_KEY, _initial_version, timeout=None)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog fragment by moving to a new version."""
+    cache = caches[get_cache_alias()]
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:  # The key is missing or was evicted
+        version = _initial_version()
+        cache.set(CATALOG_VERSION_KEY, version, timeout=None)
+        return version
+
+
+def bump_catalog_version_on_commit(using=None):
+    """Bump the version once the current transaction commits.
+
+    Bumping earlier would let a request read the old rows and cache them under
+    the new version until the fragments expire.
+    """
+    transaction.on_commit(bump_catalog_version, using=using)
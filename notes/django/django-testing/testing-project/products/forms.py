@@ -4,6 +4,16 @@ from django.core.exceptions import ValidationError
 from products.models import Product
 
 
+def validate_price(price):
+    if price < 0:
+        raise ValidationError('Price cannot be negative')
+
+
+def validate_stock_count(stock_count):
+    if stock_count < 0:
+        raise ValidationError('Stock Count cannot be negative')
+
+
 class ProductForm(forms.ModelForm):
     class Meta:
         model = Product
@@ -11,15 +21,12 @@ class ProductForm(forms.ModelForm):
 
     def clean_price(self):
         price = self.cleaned_data['price']
-        if price < 0:
-            raise ValidationError('Price cannot be negative')
+        validate_price(price)
 
         return price
 
     def clean_stock_count(self):
         stock_count = self.cleaned_data['stock_count']
-
-        if stock_count < 0:
-            raise ValidationError('Stock Count cannot be negative')
+        validate_stock_count(stock_count)
 
         return stock_count
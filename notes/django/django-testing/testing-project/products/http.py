@@ -0,0 +1,266 @@
+"""Shared HTTP client for the upstream APIs called from the products views.
+
+One ``requests.Session`` keeps connections alive between requests, and every
+call has a timeout. JSON responses are cached for ``ttl`` seconds; for
+``stale_ttl`` seconds after that the cached value is still returned while a
+background request refreshes it. Concurrent requests for the same URL share a
+single upstream call.
+
+Requests run in a thread pool and are handed out as ``concurrent.futures``
+futures, so they can be shared between threads and between event loops (each
+async view may run in its own loop under WSGI).
+
+Each upstream (scheme and host) has a ``CircuitBreaker`` and a latency
+histogram. While an upstream's circuit is open, calls to it fail immediately
+with ``CircuitOpenError`` (stale cached responses are still served) instead of
+waiting for a connection error; ``HttpClient.status()`` reports both.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cache, partial
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+
+from products.metrics import LatencyHistogram
+
+
+class CircuitOpenError(RequestException):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after ``failure_threshold`` consecutive failures.
+
+    The circuit then stays open for ``reset_timeout`` seconds, after which it
+    is half-open: one trial call is let through, and closes the circuit if it
+    succeeds or opens it again if it fails.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False  # A half-open trial call is in progress
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self.clock() - self._opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow_request(self):
+        with self._lock:
+            state = self.state
+            if state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return state == self.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+            self._trial = False
+
+    def call(self, func, *args, **kwargs):
+        """Call ``func`` through the breaker; any exception counts as a failure."""
+        if not self.allow_request():
+            raise CircuitOpenError(f'Circuit open, retrying in {self.retry_in():.1f}s')
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def retry_in(self):
+        """Seconds until the circuit half-opens, 0 if it is not open."""
+        opened_at = self._opened_at
+        if opened_at is None:
+            return 0
+        return max(self.reset_timeout - (self.clock() - opened_at), 0)
+
+
+@dataclass(frozen=True)
+class Upstream:
+    breaker: CircuitBreaker
+    latency: LatencyHistogram
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    data: object
+    fetched_at: float
+
+
+def _resolved(data):
+    future = Future()
+    future.set_result(data)
+    return future
+
+
+def _failed(exception):
+    future = Future()
+    future.set_exception(exception)
+    return future
+
+
+class HttpClient:
+    def __init__(
+        self,
+        timeout=(3.05, 10),
+        ttl=60,
+        stale_ttl=300,
+        pool_size=10,
+        failure_threshold=5,
+        reset_timeout=30,
+    ):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(pool_size, thread_name_prefix='http')
+
+        self._lock = threading.Lock()
+        self._cache = {}  # url -> CacheEntry
+        self._inflight = {}  # url -> Future
+        self._upstreams = {}  # 'scheme://host' -> Upstream
+
+    def fetch_json(self, url):
+        """Return a future with the JSON body of ``url``, cached when possible."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(url)
+            age = now - entry.fetched_at if entry else None
+            if entry and age < self.ttl:
+                return _resolved(entry.data)
+
+            future = self._inflight.get(url)
+            if future is None:
+                upstream = self._upstream(url)
+                if upstream.breaker.allow_request():
+                    future = self._executor.submit(self._fetch, url, upstream)
+                    self._inflight[url] = future
+                    future.add_done_callback(partial(self._forget_cancelled, url))
+                else:
+                    future = _failed(CircuitOpenError(f'Circuit open for {url}'))
+
+            if entry and age < self.ttl + self.stale_ttl:
+                # Stale while revalidate (or while the circuit is open)
+                return _resolved(entry.data)
+            return future
+
+    async def get_json(self, url):
+        # The future may be shared with other waiters: cancelling this
+        # coroutine (e.g. a client disconnect) must not cancel it for them
+        return await asyncio.shield(asyncio.wrap_future(self.fetch_json(url)))
+
+    def _forget_cancelled(self, url, future):
+        """Let the next request retry a fetch that was cancelled before it ran."""
+        if future.cancelled():
+            with self._lock:
+                if self._inflight.get(url) is future:
+                    del self._inflight[url]
+
+    def _upstream(self, url):
+        parts = urlsplit(url)
+        key = f'{parts.scheme}://{parts.netloc}'
+        if key not in self._upstreams:
+            self._upstreams[key] = Upstream(
+                CircuitBreaker(self.failure_threshold, self.reset_timeout),
+                LatencyHistogram(),
+            )
+        return self._upstreams[key]
+
+    def _get(self, url, upstream):
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code >= 500:
+                response.raise_for_status()  # Client errors do not trip the breaker
+        except Exception:
+            upstream.breaker.record_failure()
+            raise
+        finally:
+            upstream.latency.observe(time.perf_counter() - start)
+        upstream.breaker.record_success()
+        return response
+
+    def _fetch(self, url, upstream):
+        try:
+            response = self._get(url, upstream)
+            response.raise_for_status()
+            data = response.json()
+        except BaseException:
+            with self._lock:
+                del self._inflight[url]
+            raise
+
+        with self._lock:
+            self._cache[url] = CacheEntry(data, time.monotonic())
+            del self._inflight[url]
+        return data
+
+    def status(self):
+        """Return the circuit state and latency histogram of every upstream."""
+        with self._lock:
+            upstreams = dict(self._upstreams)
+        return {
+            key: {
+                'state': upstream.breaker.state,
+                'failures': upstream.breaker.failures,
+                'retry_in': upstream.breaker.retry_in(),
+                'latency': upstream.latency.snapshot(),
+            }
+            for key, upstream in upstreams.items()
+        }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+
+@cache
+def get_client():
+    """Return the process-wide client configured by ``PRODUCTS_HTTP_*`` settings."""
+    return HttpClient(
+        timeout=getattr(settings, 'PRODUCTS_HTTP_TIMEOUT', (3.05, 10)),
+        ttl=getattr(settings, 'PRODUCTS_HTTP_CACHE_TTL', 60),
+        stale_ttl=getattr(settings, 'PRODUCTS_HTTP_STALE_TTL', 300),
+        pool_size=getattr(settings, 'PRODUCTS_HTTP_POOL_SIZE', 10),
+        failure_threshold=getattr(settings, 'PRODUCTS_HTTP_FAILURE_THRESHOLD', 5),
+        reset_timeout=getattr(settings, 'PRODUCTS_HTTP_RESET_TIMEOUT', 30),
+    )
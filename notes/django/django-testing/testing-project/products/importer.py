@@ -0,0 +1,176 @@
+"""Bulk import of products from CSV or NDJSON files.
+
+Rows are validated with the ``ProductForm`` rules and written in batches with
+``bulk_create``/``bulk_update``. A row that fails validation, or that the
+database rejects, is reported with its line number; the rest of its batch is
+still written. Files are checked with ``check_encoding`` first, so that an
+undecodable byte does not stop the import halfway through.
+"""
+
+import codecs
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import batched
+from pathlib import PurePath
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import IntegrityError, transaction
+
+from products.cache import bump_catalog_version_on_commit
+from products.forms import ProductForm, validate_price, validate_stock_count
+from products.models import Product
+
+FORMATS = ('csv', 'ndjson')
+FIELDS = ProductForm.Meta.fields
+
+# Rows with an ``id`` update that product; rows without one create a new product
+ID_FIELD = forms.IntegerField(required=False, min_value=1)
+VALIDATORS = {'price': validate_price, 'stock_count': validate_stock_count}
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)  # [(line, {field: [messages]})]
+
+
+def guess_format(filename):
+    """Return the import format for a file name, or None if the extension is unknown."""
+    suffix = PurePath(filename).suffix.lower()
+    return {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}.get(suffix)
+
+
+def check_encoding(chunks, encoding='utf-8-sig'):
+    """Raise ``UnicodeDecodeError`` unless the byte ``chunks`` decode with ``encoding``.
+
+    Batches are committed as they are read, so decoding errors must be found
+    before importing anything.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        decoder.decode(chunk)
+    decoder.decode(b'', final=True)
+
+
+def read_rows(lines, format):
+    """Yield ``(line, row)`` pairs from an iterable of text lines.
+
+    ``row`` is a dict, or an error message when the line cannot be parsed.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'ndjson':
+        for line, text in enumerate(lines, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except json.JSONDecodeError as e:
+                yield line, f'Invalid JSON: {e.msg}'
+                continue
+            yield line, row if isinstance(row, dict) else 'Expected a JSON object'
+    else:
+        raise ValueError(f'Unknown format {format!r}, expected one of {FORMATS}')
+
+
+def clean_rows(rows):
+    """Validate a batch of ``(line, row)`` pairs with the ``ProductForm`` rules.
+
+    Instead of building one form per row, each form field cleans its whole
+    column in a single pass. Returns the valid rows as ``(line, data)`` pairs and
+    the invalid ones as ``(line, {field: [messages]})`` pairs.
+    """
+    errors = {
+        line: {NON_FIELD_ERRORS: [row]} for line, row in rows if isinstance(row, str)
+    }
+    parsed = [(line, row) for line, row in rows if not isinstance(row, str)]
+    cleaned = {line: {} for line, _ in parsed}
+
+    columns = {'id': ID_FIELD}
+    columns |= {name: ProductForm.base_fields[name] for name in FIELDS}
+    for name, form_field in columns.items():
+        validator = VALIDATORS.get(name)
+        for line, row in parsed:
+            try:
+                value = form_field.clean(row.get(name))
+                if validator is not None:
+                    validator(value)
+            except ValidationError as e:
+                errors.setdefault(line, {})[name] = e.messages
+            else:
+                cleaned[line][name] = value
+
+    valid = [(line, data) for line, data in cleaned.items() if line not in errors]
+    return valid, list(errors.items())
+
+
+def _write(rows):
+    existing = Product.objects.in_bulk(
+        [data['id'] for _, data in rows if data['id'] is not None]
+    )
+    to_create, to_update, errors = [], [], []
+
+    for line, data in rows:
+        values = {name: data[name] for name in FIELDS}
+        if data['id'] is None:
+            to_create.append(Product(**values))
+        elif data['id'] in existing:
+            product = existing[data['id']]
+            for name, value in values.items():
+                setattr(product, name, value)
+            to_update.append(product)
+        else:
+            errors.append((line, {'id': [f'Product {data["id"]} does not exist']}))
+
+    Product.objects.bulk_create(to_create)
+    Product.objects.bulk_update(to_update, FIELDS)
+    return len(to_create), len(to_update), errors
+
+
+def save_rows(rows, result):
+    """Write a batch of cleaned rows, retrying them one by one if the database rejects it."""
+    try:
+        with transaction.atomic():
+            created, updated, errors = _write(rows)
+    except IntegrityError:
+        # Something in the batch violates a constraint: find out which rows
+        created, updated, errors = 0, 0, []
+        for line, data in rows:
+            try:
+                with transaction.atomic():
+                    row_created, row_updated, row_errors = _write([(line, data)])
+            except IntegrityError as e:
+                errors.append((line, {NON_FIELD_ERRORS: [str(e)]}))
+            else:
+                created += row_created
+                updated += row_updated
+                errors.extend(row_errors)
+
+    result.created += created
+    result.updated += updated
+    result.errors.extend(errors)
+
+
+def import_products(lines, format, batch_size=None):
+    """Import products from an iterable of CSV or NDJSON text lines."""
+    if batch_size is None:
+        batch_size = getattr(settings, 'PRODUCTS_IMPORT_BATCH_SIZE', 1000)
+
+    result = ImportResult()
+    for batch in batched(read_rows(lines, format), batch_size):
+        valid, errors = clean_rows(batch)
+        result.errors.extend(errors)
+        if valid:
+            save_rows(valid, result)
+
+    result.errors.sort(key=lambda error: error[0])
+    if result.updated:
+        # bulk_update sends no signal (bulk_create sends post_bulk_create)
+        bump_catalog_version_on_commit()
+    return result
@@ -0,0 +1,202 @@
+"""Batching mailer: many emails, one SMTP connection.
+
+``send_mail`` opens and closes a connection for every message. ``BatchMailer``
+queues messages and a background thread sends them in batches of up to
+``batch_size``, or whatever arrived within ``window`` seconds of the first one,
+over a single connection per batch.
+
+If the connection fails (or the server answers 4xx, "try again later"), the
+messages not sent yet are retried with exponential backoff. A message the
+server rejects outright (a 5xx reply, e.g. an invalid recipient) or that cannot
+be sent for any other reason is set aside on its own and the batch goes on.
+Messages set aside, and those still failing after the retries, are appended to
+a JSON Lines dead-letter file so they can be inspected and sent again.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import smtplib
+import threading
+import time
+from datetime import UTC, datetime
+from functools import cache
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Failures of the connection rather than of one message
+CONNECTION_ERRORS = (smtplib.SMTPException, OSError)
+
+
+def _is_transient(error):
+    """Return True if sending a message may succeed on a new connection.
+
+    Connection failures and 4xx replies are transient. 5xx replies, refused
+    recipients and errors that are not about SMTP at all would fail the same
+    way again.
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPException):  # e.g. SMTPRecipientsRefused
+        return False
+    return isinstance(error, OSError)
+
+
+def _shutting_down():
+    """Return True once the interpreter exits: no new thread can start then."""
+    return not threading.main_thread().is_alive()
+
+
+class BatchMailer:
+    def __init__(
+        self,
+        batch_size=100,
+        window=1.0,
+        retries=3,
+        backoff=0.5,
+        dead_letter_path=None,
+        connection_factory=get_connection,
+    ):
+        self.batch_size = batch_size
+        self.window = window
+        self.retries = retries
+        self.backoff = backoff
+        self.dead_letter_path = dead_letter_path
+        self.connection_factory = connection_factory
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        """Queue an ``EmailMessage``; it is sent by the background thread.
+
+        If the thread cannot be started, e.g. while the interpreter exits, the
+        message is sent right away instead.
+        """
+        with self._lock:
+            started = self._thread is not None or self._start_thread()
+        if started:
+            self._queue.put(message)
+        else:
+            logger.warning('Mailer thread unavailable, sending the email inline')
+            self.deliver([message])
+
+    def _start_thread(self):
+        """Start the background thread; return False if none can be started."""
+        if _shutting_down():
+            return False
+        thread = threading.Thread(target=self._run, name='batch-mailer', daemon=True)
+        try:
+            thread.start()
+        except RuntimeError:  # e.g. "can't create new thread at interpreter shutdown"
+            return False
+        self._thread = thread  # Only published once it runs, see flush()
+        return True
+
+    def flush(self, timeout=None):
+        """Send everything queued so far and wait until it is delivered.
+
+        Returns False if that took longer than ``timeout`` seconds.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _next_batch(self):
+        """Return the next batch and the flush event that closed it, if any."""
+        batch = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.window
+
+        while not isinstance(item, threading.Event):
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                return batch, None
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, None
+        return batch, item
+
+    def _run(self):
+        while True:
+            batch, flushed = self._next_batch()
+            try:
+                if batch:
+                    self.deliver(batch)
+            except Exception:
+                logger.exception('Could not deliver %d emails', len(batch))
+            finally:
+                if flushed is not None:
+                    flushed.set()
+
+    def deliver(self, messages):
+        """Send ``messages`` over one connection, retrying the unsent ones.
+
+        A message that fails for a reason of its own is dead-lettered alone.
+        """
+        pending = list(messages)
+        for attempt in range(self.retries + 1):
+            try:
+                with self.connection_factory(fail_silently=False) as connection:
+                    while pending:
+                        try:
+                            connection.send_messages(pending[:1])
+                        except Exception as e:
+                            if _is_transient(e):
+                                raise
+                            logger.error(
+                                'Could not send email to %s: %s', pending[0].to, e
+                            )
+                            self.dead_letter(pending[:1], e)
+                        pending.pop(0)
+                return
+            except CONNECTION_ERRORS as e:
+                error = e
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2**attempt)
+
+        logger.error('Giving up on %d emails: %s', len(pending), error)
+        self.dead_letter(pending, error)
+
+    def dead_letter(self, messages, error):
+        if self.dead_letter_path is None:
+            return
+
+        failed_at = datetime.now(UTC).isoformat()
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as file:
+            for message in messages:
+                record = {
+                    'failed_at': failed_at,
+                    'error': repr(error),
+                    'subject': message.subject,
+                    'from_email': message.from_email,
+                    'to': message.to,
+                    'body': message.body,
+                }
+                file.write(json.dumps(record) + '\n')
+
+
+@cache
+def get_mailer():
+    """Return the process-wide mailer, configured by the ``MAILER_*`` settings."""
+    mailer = BatchMailer(
+        batch_size=getattr(settings, 'MAILER_BATCH_SIZE', 100),
+        window=getattr(settings, 'MAILER_BATCH_WINDOW', 1.0),
+        retries=getattr(settings, 'MAILER_RETRIES', 3),
+        backoff=getattr(settings, 'MAILER_RETRY_BACKOFF', 0.5),
+        dead_letter_path=getattr(settings, 'MAILER_DEAD_LETTER_PATH', None),
+    )
+    # Do not lose the last batch on shutdown, but do not hang the exit either
+    atexit.register(mailer.flush, getattr(settings, 'MAILER_SHUTDOWN_TIMEOUT', 10))
+    return mailer
@@ -0,0 +1,56 @@
+"""Runtime maintenance flag shared by every worker through the cache.
+
+``MAINTENANCE_MODE`` in settings still forces maintenance on; the flag adds a
+switch that can be flipped without a deploy (``manage.py maintenance_mode on``).
+For the switch to reach every worker, ``MAINTENANCE_CACHE_ALIAS`` must name a
+cache shared between processes: the shipped ``maintenance`` alias is a file
+cache, which also works with Redis or Memcached swapped in. A ``LocMemCache``
+only lives in the process that writes it, so the management command refuses
+to use one.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+MAINTENANCE_KEY = 'products:maintenance-mode'
+
+
+def _get_cache():
+    return caches[getattr(settings, 'MAINTENANCE_CACHE_ALIAS', 'default')]
+
+
+def is_shared():
+    """Return False if the flag cache is not seen by the other processes."""
+    return not isinstance(_get_cache(), (LocMemCache, DummyCache))
+
+
+def get_maintenance_mode():
+    return bool(_get_cache().get(MAINTENANCE_KEY, False))
+
+
+def set_maintenance_mode(enabled):
+    _get_cache().set(MAINTENANCE_KEY, bool(enabled), timeout=None)
+
+
+class MaintenanceFlag:
+    """Reads the shared flag at most once every ``ttl`` seconds per process.
+
+    Between reads the last value is returned from memory, so checking the flag
+    costs a clock read on almost every request.
+    """
+
+    def __init__(self, ttl=1.0):
+        self.ttl = ttl
+        self._value = False
+        self._expires_at = float('-inf')
+
+    def is_on(self):
+        now = time.monotonic()
+        if now >= self._expires_at:
+            self._value = get_maintenance_mode()
+            self._expires_at = now + self.ttl
+        return self._value
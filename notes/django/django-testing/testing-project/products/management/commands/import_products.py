@@ -0,0 +1,51 @@
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import FORMATS, check_encoding, guess_format, import_products
+
+CHUNK_SIZE = 64 * 1024
+
+
+class Command(BaseCommand):
+    help = 'Import products from a CSV or NDJSON file, creating or updating by id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import')
+        parser.add_argument(
+            '--format', choices=FORMATS, help='Defaults to the file extension'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, help='Rows validated and written per batch'
+        )
+
+    def handle(self, *args, **options):
+        format = options['format'] or guess_format(options['path'])
+        if format is None:
+            raise CommandError('Cannot guess the format, use --format csv|ndjson')
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        try:
+            with open(options['path'], 'rb') as file:
+                check_encoding(iter(partial(file.read, CHUNK_SIZE), b''))
+            with open(options['path'], encoding='utf-8-sig', newline='') as file:
+                result = import_products(file, format, options['batch_size'])
+        except UnicodeDecodeError as e:
+            raise CommandError(
+                f'{options["path"]} is not UTF-8 encoded ({e.reason}), '
+                'nothing was imported'
+            ) from e
+        except OSError as e:
+            raise CommandError(e) from e
+
+        for line, errors in result.errors:
+            for field, messages in errors.items():
+                self.stderr.write(f'Line {line}: {field}: {" ".join(messages)}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{result.created} created, {result.updated} updated, '
+                f'{len(result.errors)} rejected'
+            )
+        )
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.maintenance import get_maintenance_mode, is_shared, set_maintenance_mode
+
+
+class Command(BaseCommand):
+    help = 'Turn the runtime maintenance mode on or off, or show its state'
+
+    def add_arguments(self, parser):
+        parser.add_argument('state', choices=('on', 'off', 'status'))
+
+    def handle(self, *args, **options):
+        if not is_shared():
+            alias = getattr(settings, 'MAINTENANCE_CACHE_ALIAS', 'default')
+            raise CommandError(
+                f'The {alias!r} cache is local to this process, so the server '
+                'would never see the flag. Set MAINTENANCE_CACHE_ALIAS to a '
+                'cache shared by every worker.'
+            )
+
+        if options['state'] != 'status':
+            set_maintenance_mode(options['state'] == 'on')
+
+        state = 'on' if get_maintenance_mode() else 'off'
+        self.stdout.write(f'Maintenance mode is {state}')
@@ -0,0 +1,126 @@
+import bisect
+import math
+import threading
+from collections import deque
+from functools import cache
+
+from django.conf import settings
+
+# Upper bounds of the histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Thread-safe histogram of durations with fixed buckets.
+
+    Recording is O(log buckets) and memory does not grow with the number of
+    observations; percentiles are the upper bound of the bucket they fall in.
+    """
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)  # Last one: above all bounds
+        self._total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+            self._total_ms += ms
+
+    def _percentile(self, counts, pct):
+        rank = pct / 100 * sum(counts)
+        seen = 0
+        for bound, count in zip(self.buckets_ms + (math.inf,), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+
+    def percentile(self, pct):
+        """Return the bucket bound below which ``pct`` % of the observations fall.
+
+        ``None`` if nothing was observed, ``inf`` past the last bucket.
+        """
+        with self._lock:
+            counts = list(self._counts)
+        return self._percentile(counts, pct) if any(counts) else None
+
+    def snapshot(self):
+        """Return the histogram as a JSON-serializable dict.
+
+        Percentiles past the last bucket are reported as ``None``.
+        """
+        with self._lock:
+            counts, total_ms = list(self._counts), self._total_ms
+        count = sum(counts)
+
+        snapshot = {
+            'count': count,
+            'mean_ms': total_ms / count if count else None,
+            'buckets': {
+                **{f'le_{bound}ms': n for bound, n in zip(self.buckets_ms, counts)},
+                'overflow': counts[-1],
+            },
+        }
+        for pct in (50, 95, 99):
+            value = self._percentile(counts, pct) if count else None
+            snapshot[f'p{pct}_ms'] = None if value == math.inf else value
+        return snapshot
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+class RequestStats:
+    """Per-view profiles of the last ``window`` sampled requests of each view.
+
+    A profile is a dict of metric name to value (or None when it was not
+    measured); ``summary()`` reports the p50/p95/p99 of every metric over the
+    window.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}  # view name -> deque of profiles
+        self._counts = {}  # view name -> requests sampled since startup
+        self._lock = threading.Lock()
+
+    def record(self, view_name, profile):
+        with self._lock:
+            if view_name not in self._samples:
+                self._samples[view_name] = deque(maxlen=self.window)
+                self._counts[view_name] = 0
+            self._samples[view_name].append(profile)
+            self._counts[view_name] += 1
+
+    def summary(self):
+        with self._lock:
+            samples = {name: list(window) for name, window in self._samples.items()}
+            counts = dict(self._counts)
+
+        summary = {}
+        for name, profiles in sorted(samples.items()):
+            summary[name] = {'sampled': counts[name], 'window': len(profiles)}
+            for metric in profiles[0]:
+                # None marks a value that was not measured, e.g. a streamed size
+                values = [p[metric] for p in profiles if p[metric] is not None]
+                summary[name][metric] = {
+                    f'p{pct}': percentile(values, pct) if values else None
+                    for pct in (50, 95, 99)
+                }
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+@cache
+def get_request_stats():
+    """Return the process-wide request stats, sized by ``PROFILING_WINDOW``."""
+    return RequestStats(getattr(settings, 'PROFILING_WINDOW', 1000))
@@ -1,15 +1,173 @@
+import random
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+from ipaddress import ip_address, ip_network
+
 from django.conf import settings
+from django.db import connections
 from django.http import HttpResponse
+from django.template.base import Template
+
+from products.maintenance import MaintenanceFlag
+from products.metrics import get_request_stats
+
+# Profile of the request being handled, read by the template instrumentation
+_current_profile = ContextVar('current_profile', default=None)
 
 
 class MaintenanceModeMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
+        # Settings do not change while the process runs: read them once
+        self.forced = getattr(settings, 'MAINTENANCE_MODE', False)
+        self.flag = MaintenanceFlag(getattr(settings, 'MAINTENANCE_LOCAL_TTL', 1.0))
+        self.allowed_paths = tuple(getattr(settings, 'MAINTENANCE_ALLOWED_PATHS', ()))
+        self.allowed_networks = [
+            ip_network(network)
+            for network in getattr(settings, 'MAINTENANCE_ALLOWED_IPS', ())
+        ]
+
     def __call__(self, request):
-        maintenance_mode = getattr(settings, 'MAINTENANCE_MODE', False)
+        maintenance_mode = self.forced or self.flag.is_on()
 
-        if maintenance_mode:
+        if maintenance_mode and not self.is_allowed(request):
             return HttpResponse('Site under maintenance', status=503)
         else:
             return self.get_response(request)
+
+    def is_allowed(self, request):
+        """Return True if the request bypasses maintenance by path or client IP."""
+        if request.path.startswith(self.allowed_paths):
+            return True
+
+        try:
+            address = ip_address(request.META.get('REMOTE_ADDR', ''))
+        except ValueError:
+            return False
+        return any(address in network for network in self.allowed_networks)
+
+
+@dataclass
+class RequestProfile:
+    queries: int = 0
+    sql_ms: float = 0.0
+    template_ms: float = 0.0
+    template_depth: int = 0  # Included templates are timed by their parent
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_ms += (time.perf_counter() - start) * 1000
+
+
+class _TemplateTimer:
+    """Time ``Template.render`` for the profiled requests.
+
+    ``Template.render`` is only patched while at least one profiled request
+    is being handled, and the original is restored when the last one ends.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = 0
+        self._render = None
+
+    def __enter__(self):
+        with self._lock:
+            if not self._users:
+                self._render = Template.render
+                Template.render = self._wrap(self._render)
+            self._users += 1
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self._users -= 1
+            if not self._users:
+                Template.render = self._render
+                self._render = None
+
+    @staticmethod
+    def _wrap(render):
+        @wraps(render)
+        def profiled_render(self, context):
+            profile = _current_profile.get()
+            if profile is None or profile.template_depth:
+                return render(self, context)
+
+            profile.template_depth += 1
+            start = time.perf_counter()
+            try:
+                return render(self, context)
+            finally:
+                profile.template_ms += (time.perf_counter() - start) * 1000
+                profile.template_depth -= 1
+
+        return profiled_render
+
+
+_template_timer = _TemplateTimer()
+
+
+class ProfilingMiddleware:
+    """Profile a sample of requests and aggregate the results per URL name.
+
+    Sampled responses get a ``Server-Timing`` header with the wall time, SQL
+    time (and query count) and template render time, and their profile is
+    added to the stats served by the ``profiling-stats`` view. Requests that
+    are not sampled only pay for one random number. ``PROFILING_SAMPLE_RATE``
+    defaults to 1%.
+
+    Queries run by async views happen on another thread's connection and are
+    not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.01)
+        self.stats = get_request_stats()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(_template_timer)
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            wall_ms = (time.perf_counter() - start) * 1000
+            _current_profile.reset(token)
+
+        response['Server-Timing'] = (
+            f'total;dur={wall_ms:.2f}, '
+            f'db;dur={profile.sql_ms:.2f};desc="{profile.queries} queries", '
+            f'template;dur={profile.template_ms:.2f}'
+        )
+
+        match = request.resolver_match
+        self.stats.record(
+            match.view_name if match else 'unresolved',
+            {
+                'wall_ms': wall_ms,
+                'queries': profile.queries,
+                'sql_ms': profile.sql_ms,
+                'template_ms': profile.template_ms,
+                'size_bytes': None if response.streaming else len(response.content),
+            },
+        )
+        return response
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:50
+
+import products.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_product_stock_count_idx'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', products.models.UserManager()),
+            ],
+        ),
+    ]
@@ -1,24 +1,60 @@
 from decimal import Decimal
 
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as BaseUserManager
 from django.db import models
-from django.db.models import CheckConstraint, Q
+from django.db.models import CheckConstraint, F, Q, Value
+from django.db.models.functions import Round
 
+from products.bulk import BulkSignalsQuerySet
 
-class User(AbstractUser):
+
+class UserManager(BaseUserManager.from_queryset(BulkSignalsQuerySet)):
     pass
 
 
+class User(AbstractUser):
+    objects = UserManager()
+
+
+class ProductQuerySet(BulkSignalsQuerySet):
+    def in_stock(self):
+        """SQL counterpart of ``Product.in_stock``, served by the stock_count index."""
+        return self.filter(stock_count__gt=0)
+
+    def with_discounted_price(self, discount_percentage: int):
+        """Annotate ``discounted_price``, ``get_discounted_price`` rounded to cents.
+
+        The price is computed by the database, so it can be filtered and
+        ordered on without loading the products. SQL ``ROUND`` rounds halves
+        away from zero (``ROUND_HALF_UP`` for prices), not to even like
+        ``Decimal.quantize`` does by default: 1.25 at 50% gives 0.63.
+        """
+        factor = 1 - Decimal(discount_percentage) / Decimal(100)
+        return self.annotate(
+            discounted_price=Round(
+                F('price') * Value(factor, output_field=models.DecimalField()),
+                2,
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+
+
 class Product(models.Model):
     name = models.CharField(max_length=128)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock_count = models.IntegerField(default=0)
 
+    objects = ProductQuerySet.as_manager()
+
     @property
     def in_stock(self):
         return self.stock_count > 0
 
     class Meta:
+        indexes = [
+            models.Index(fields=['stock_count'], name='product_stock_count_idx'),
+        ]
         constraints = [
             CheckConstraint(
                 check=Q(price__gt=0),
@@ -26,9 +62,9 @@ class Product(models.Model):
                 violation_error_message='Price must be greater than zero',
             ),
             CheckConstraint(
-                check=Q(stock_count__gt=0),
-                name='stock_count_greater_than_zero',
-                violation_error_message='Stock Count must be greater than zero',
+                check=Q(stock_count__gte=0),
+                name='stock_count_not_negative',
+                violation_error_message='Stock Count cannot be negative',
             ),
         ]
 
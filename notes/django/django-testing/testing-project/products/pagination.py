@@ -0,0 +1,46 @@
+from functools import cached_property
+
+
+class KeysetPage:
+    """A page of a queryset ordered by primary key, starting after a cursor.
+
+    Unlike offset pagination, fetching page N costs the same as fetching page 1:
+    the query is ``WHERE pk > cursor ORDER BY pk LIMIT size + 1``. The extra
+    row only tells whether there is a next page. Rows are fetched lazily, the
+    first time the page is iterated or measured.
+    """
+
+    def __init__(self, queryset, after=None, size=20):
+        self.queryset = queryset
+        self.after = after
+        self.size = size
+
+    @cached_property
+    def _rows(self):
+        queryset = self.queryset.order_by('pk')
+        if self.after is not None:
+            queryset = queryset.filter(pk__gt=self.after)
+
+        return list(queryset[: self.size + 1])
+
+    def __iter__(self):
+        return iter(self._rows[: self.size])
+
+    def __len__(self):
+        return len(self._rows[: self.size])
+
+    @property
+    def has_next(self):
+        return len(self._rows) > self.size
+
+    @property
+    def next_cursor(self):
+        return self._rows[self.size - 1].pk if self.has_next else None
+
+
+def parse_cursor(value):
+    """Return the cursor from a query string value, or None if it is missing or invalid."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
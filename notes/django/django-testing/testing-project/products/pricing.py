@@ -0,0 +1,87 @@
+"""Batch discount pricing.
+
+``Product.get_discounted_price`` prices one product under one discount.
+``price_matrix`` prices many products under several discounts in one pass:
+each discount factor is computed once, and querysets are read as
+``(pk, price)`` tuples instead of model instances.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import cached_property
+
+from django.db.models import QuerySet
+
+HUNDRED = Decimal(100)
+
+
+@dataclass(frozen=True)
+class PriceMatrix:
+    """Discounted prices, one row per product and one column per percentage.
+
+    Prices are ``Decimal`` values, or ``int`` cents when built with ``cents=True``.
+    """
+
+    product_ids: tuple
+    percentages: tuple
+    rows: tuple
+
+    @cached_property
+    def _positions(self):
+        return (
+            {product_id: i for i, product_id in enumerate(self.product_ids)},
+            {percentage: i for i, percentage in enumerate(self.percentages)},
+        )
+
+    def get(self, product_id, discount_percentage):
+        rows, columns = self._positions
+        return self.rows[rows[product_id]][columns[discount_percentage]]
+
+    def as_dict(self):
+        """Return ``{product_id: {percentage: price}}``."""
+        return {
+            product_id: dict(zip(self.percentages, row))
+            for product_id, row in zip(self.product_ids, self.rows)
+        }
+
+
+def _prices(products):
+    if isinstance(products, QuerySet):
+        return list(products.values_list('pk', 'price'))
+    return [(product.pk, product.price) for product in products]
+
+
+def _to_hundredths(value, name):
+    # Decimal(10.1) is the binary float, 10.0999...; str() gives back 10.1
+    exact = Decimal(str(value)) if isinstance(value, float) else Decimal(value)
+    hundredths = exact.scaleb(2)
+    integral = int(hundredths)
+    if integral != hundredths:
+        raise ValueError(f'{name} {value} has more than two decimal places')
+    return integral
+
+
+def price_matrix(products, discount_percentages, cents=False):
+    """Price ``products`` (a queryset or an iterable of products) under every discount.
+
+    By default the result is exactly ``get_discounted_price`` for each pair.
+    With ``cents=True`` prices are converted once to integer cents and the
+    whole matrix is computed with integer arithmetic, rounding half up to the
+    cent; percentages may then have at most two decimal places.
+    """
+    percentages = tuple(discount_percentages)
+    prices = _prices(products)
+
+    # Build the matrix a column (one discount) at a time, then transpose it
+    if cents:
+        amounts = [_to_hundredths(price, 'Price') for _, price in prices]
+        # Discounts in basis points: price * (10000 - bp) / 10000
+        multipliers = [10_000 - _to_hundredths(pct, 'Discount') for pct in percentages]
+        columns = [[(a * m + 5_000) // 10_000 for a in amounts] for m in multipliers]
+    else:
+        amounts = [Decimal(price) for _, price in prices]
+        factors = [1 - Decimal(pct) / HUNDRED for pct in percentages]
+        columns = [[a * factor for a in amounts] for factor in factors]
+
+    rows = tuple(zip(*columns)) if columns else ((),) * len(prices)
+    return PriceMatrix(tuple(pk for pk, _ in prices), percentages, rows)
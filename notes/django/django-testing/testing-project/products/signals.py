@@ -1,16 +1,40 @@
-from django.core.mail import send_mail
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from products.models import User
+from products import tasks
+from products.bulk import in_bulk_delete, post_bulk_create, post_bulk_delete
+from products.cache import bump_catalog_version_on_commit
+from products.models import Product, User
 
 
 @receiver(post_save, sender=User)
 def send_welcome_email(sender, instance, created, **kwargs):
     if created:
         # print('Signal fired!')
-        subject = 'Thank you for signing up'
-        message = 'Welcome to the app'
-        from_email = 'admin@django.com'
-        recipient_list = [instance.email]
-        send_mail(subject, message, from_email, recipient_list, fail_silently=False)
+        # Sent in the background once the signup is committed
+        tasks.enqueue(tasks.send_welcome_email, instance.email)
+
+
+@receiver(post_bulk_create, sender=User)
+def send_welcome_emails(
+    sender, instances, ignore_conflicts=False, update_conflicts=False, **kwargs
+):
+    if ignore_conflicts or update_conflicts:
+        return  # Existing users cannot be told apart from new ones
+    emails = [user.email for user in instances if user.email]
+    if emails:
+        # One background task for the whole batch
+        tasks.enqueue(tasks.send_welcome_emails, emails)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_list_cache(sender, instance, using=None, **kwargs):
+    if not in_bulk_delete(sender):  # Bumped once by the batch receiver instead
+        bump_catalog_version_on_commit(using=using)
+
+
+@receiver(post_bulk_create, sender=Product)
+@receiver(post_bulk_delete, sender=Product)
+def invalidate_product_list_cache_in_bulk(sender, instances, using=None, **kwargs):
+    bump_catalog_version_on_commit(using=using)
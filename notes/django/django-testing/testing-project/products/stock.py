@@ -0,0 +1,86 @@
+"""Stock reservations that stay correct under concurrent checkouts.
+
+Stock is never read into Python and written back: every change is a single
+``UPDATE ... SET stock_count = stock_count - n`` guarded by a ``WHERE`` clause,
+so two requests cannot both spend the same units, and the last unit can be
+sold (the ``stock_count >= 0`` constraint backs the guard up).
+"""
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from products.models import Product
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f'Not enough stock for products {self.product_ids}')
+
+
+def _check_quantity(quantity):
+    if quantity < 1:
+        raise ValueError('Quantity must be at least 1')
+
+
+def reserve(product_id, quantity, using='default'):
+    """Take ``quantity`` units of a product or raise ``InsufficientStock``."""
+    _check_quantity(quantity)
+    updated = (
+        Product.objects.using(using)
+        .filter(pk=product_id, stock_count__gte=quantity)
+        .update(stock_count=F('stock_count') - quantity)
+    )
+    if not updated:
+        raise InsufficientStock([product_id])
+
+
+def release(product_id, quantity, using='default'):
+    """Give back ``quantity`` previously reserved units of a product."""
+    _check_quantity(quantity)
+    Product.objects.using(using).filter(pk=product_id).update(
+        stock_count=F('stock_count') + quantity
+    )
+
+
+def reserve_many(quantities, using='default'):
+    """Reserve ``{product_id: quantity}`` all together or not at all.
+
+    The products are locked in primary key order, so concurrent reservations
+    cannot deadlock on databases with row locks, and then all of them are
+    decremented by a single conditional ``UPDATE``. If any product is short,
+    nothing is reserved and ``InsufficientStock`` lists the products that were.
+    """
+    for quantity in quantities.values():
+        _check_quantity(quantity)
+    if not quantities:
+        return
+
+    products = Product.objects.using(using)
+    quantity = Case(
+        *(When(pk=pk, then=Value(n)) for pk, n in quantities.items()),
+        output_field=IntegerField(),
+    )
+
+    try:
+        with transaction.atomic(using=using):
+            list(
+                products.select_for_update()
+                .filter(pk__in=quantities)
+                .order_by('pk')
+                .values_list('pk', flat=True)
+            )
+            updated = products.filter(
+                pk__in=quantities, stock_count__gte=quantity
+            ).update(stock_count=F('stock_count') - quantity)
+
+            if updated != len(quantities):
+                raise InsufficientStock([])
+    except InsufficientStock:
+        # Rolled back; look up which products were short to report them
+        available = dict(
+            products.filter(pk__in=quantities).values_list('pk', 'stock_count')
+        )
+        raise InsufficientStock(
+            pk for pk, n in quantities.items() if available.get(pk, 0) < n
+        ) from None
@@ -0,0 +1,25 @@
+"""Opt-in benchmarks.
+
+Benchmark classes are tagged ``benchmark`` and skipped unless ``BENCHMARKS``
+is set, so the default test run stays fast and quiet::
+
+    BENCHMARKS=1 python manage.py test --tag benchmark
+"""
+
+import os
+import sys
+from unittest import skipUnless
+
+from django.test import tag
+
+
+def benchmark(cls):
+    """Tag ``cls`` as a benchmark and only run it when ``BENCHMARKS`` is set."""
+    run = skipUnless(os.environ.get('BENCHMARKS'), 'Set BENCHMARKS=1 to run it')
+    return tag('benchmark')(run(cls))
+
+
+def report(title, rows):
+    """Write a timing table to stderr, the stream the test runner reports on."""
+    lines = [f'\n{title}'] + [f'  {name:<26} {value}' for name, value in rows]
+    sys.stderr.write('\n'.join(lines) + '\n')
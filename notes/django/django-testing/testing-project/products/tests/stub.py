@@ -0,0 +1,121 @@
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer:
+    """Local HTTP server that answers every GET with a JSON body.
+
+    ``body`` may be a callable taking the request number (starting at 1).
+    Use it as a context manager; ``requests`` counts the requests received.
+    """
+
+    def __init__(self, body=None, status=200, delay=0):
+        self.body = body if body is not None else {}
+        self.status = status
+        self.delay = delay
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    n = stub.requests
+                time.sleep(stub.delay)
+
+                body = stub.body(n) if callable(stub.body) else stub.body
+                content = json.dumps(body).encode()
+                self.send_response(stub.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                try:
+                    self.wfile.write(content)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client gave up, e.g. after a timeout
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+class SmtpStubServer:
+    """Local SMTP server that accepts every message and counts connections.
+
+    ``delay`` is added to every reply, to stand in for a network round trip.
+    """
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.connections = 0
+        self.messages = []
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                time.sleep(stub.delay)
+                self.wfile.write(line.encode() + b'\r\n')
+
+            def handle(self):
+                with stub._lock:
+                    stub.connections += 1
+                self.reply('220 localhost SMTP stub')
+                while line := self.rfile.readline():
+                    command = line.decode().strip().upper()
+                    if command.startswith(('EHLO', 'HELO')):
+                        self.reply('250 localhost')
+                    elif command == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        data = []
+                        while (part := self.rfile.readline()) not in (b'.\r\n', b''):
+                            data.append(part)
+                        with stub._lock:
+                            stub.messages.append(b''.join(data))
+                        self.reply('250 OK')
+                    elif command == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:  # MAIL, RCPT, RSET, NOOP
+                        self.reply('250 OK')
+
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
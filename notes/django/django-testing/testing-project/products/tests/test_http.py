@@ -0,0 +1,263 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+from requests.exceptions import HTTPError, RequestException
+
+from products.http import CircuitBreaker, CircuitOpenError, HttpClient
+from products.tests.stub import StubServer
+
+
+class HttpClientTest(SimpleTestCase):
+    def get_client(self, **kwargs):
+        client = HttpClient(**kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_caches_responses(self):
+        """Test that a fresh response is served from the cache."""
+        client = self.get_client(ttl=60)
+
+        with StubServer(lambda n: {'n': n}) as stub:
+            first = client.fetch_json(stub.url).result()
+            second = client.fetch_json(stub.url).result()
+
+        self.assertEqual(first, {'n': 1})
+        self.assertEqual(second, {'n': 1})
+        self.assertEqual(stub.requests, 1)
+
+    def test_coalesces_concurrent_requests(self):
+        """Test that concurrent requests for one URL share one upstream call."""
+        client = self.get_client()
+
+        with StubServer({'id': 1}, delay=0.2) as stub:
+            with ThreadPoolExecutor(10) as executor:
+                futures = [
+                    executor.submit(lambda: client.fetch_json(stub.url).result())
+                    for _ in range(10)
+                ]
+                results = [future.result() for future in futures]
+
+        self.assertEqual(results, [{'id': 1}] * 10)
+        self.assertEqual(stub.requests, 1)
+
+    def test_coalesces_across_event_loops(self):
+        """Test that coroutines in different event loops share one upstream call."""
+        client = self.get_client()
+
+        with StubServer({'id': 1}, delay=0.2) as stub:
+            with ThreadPoolExecutor(4) as executor:
+                futures = [
+                    executor.submit(asyncio.run, client.get_json(stub.url))
+                    for _ in range(4)
+                ]
+                results = [future.result() for future in futures]
+
+        self.assertEqual(results, [{'id': 1}] * 4)
+        self.assertEqual(stub.requests, 1)
+
+    def test_cancelled_waiter_does_not_cancel_shared_fetch(self):
+        """Test that cancelling one waiter leaves the fetch to the other requests."""
+        client = self.get_client(pool_size=1)
+
+        async def main(stub):
+            slow = asyncio.ensure_future(client.get_json(stub.url + 'slow'))
+            queued = asyncio.ensure_future(client.get_json(stub.url + 'queued'))
+            await asyncio.sleep(0.05)  # The queued fetch waits for the only worker
+            queued.cancel()
+            await slow
+            return [await client.get_json(stub.url + 'queued') for _ in range(3)]
+
+        with StubServer({'id': 1}, delay=0.2) as stub:
+            results = asyncio.run(main(stub))
+
+        self.assertEqual(results, [{'id': 1}] * 3)
+
+    def test_cancelled_fetch_is_retried(self):
+        """Test that a fetch cancelled before it ran is not shared afterwards."""
+        client = self.get_client(pool_size=1)
+
+        with StubServer({'id': 1}, delay=0.2) as stub:
+            slow = client.fetch_json(stub.url + 'slow')
+            queued = client.fetch_json(stub.url + 'queued')
+            self.assertTrue(queued.cancel())
+            slow.result()
+
+            result = client.fetch_json(stub.url + 'queued').result(timeout=5)
+
+        self.assertEqual(result, {'id': 1})
+
+    def test_stale_while_revalidate(self):
+        """Test that a stale response is served while it is refreshed."""
+        client = self.get_client(ttl=0.1, stale_ttl=60)
+
+        with StubServer(lambda n: {'n': n}) as stub:
+            client.fetch_json(stub.url).result()
+            time.sleep(0.15)
+
+            stale = client.fetch_json(stub.url)
+            self.assertTrue(stale.done())
+            self.assertEqual(stale.result(), {'n': 1})
+
+            deadline = time.monotonic() + 5
+            while client.fetch_json(stub.url).result() == {'n': 1}:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+
+        self.assertEqual(client.fetch_json(stub.url).result(), {'n': 2})
+        self.assertEqual(stub.requests, 2)
+
+    def test_expired_entry_waits_for_upstream(self):
+        """Test that past the stale window the caller waits for a fresh response."""
+        client = self.get_client(ttl=0, stale_ttl=0)
+
+        with StubServer(lambda n: {'n': n}) as stub:
+            client.fetch_json(stub.url).result()
+            self.assertEqual(client.fetch_json(stub.url).result(), {'n': 2})
+
+    def test_errors_are_not_cached(self):
+        """Test that upstream errors are raised and retried on the next call."""
+        client = self.get_client()
+
+        with StubServer({'error': 'boom'}, status=500) as stub:
+            for _ in range(2):
+                with self.assertRaises(HTTPError):
+                    client.fetch_json(stub.url).result()
+
+        self.assertEqual(stub.requests, 2)
+
+    def test_timeout(self):
+        """Test that a slow upstream fails after the read timeout."""
+        client = self.get_client(timeout=(1, 0.1))
+
+        with StubServer({'id': 1}, delay=0.5) as stub:
+            with self.assertRaises(RequestException):
+                client.fetch_json(stub.url).result()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            failure_threshold=3, reset_timeout=10, clock=self.clock
+        )
+
+    def fail(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.breaker.call(lambda: 1 / 0)
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that the circuit opens after the failure threshold."""
+        for _ in range(2):
+            self.fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+        self.fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(lambda: 'not called')
+
+    def test_success_resets_failures(self):
+        """Test that only consecutive failures count."""
+        self.fail()
+        self.fail()
+        self.assertEqual(self.breaker.call(lambda: 'ok'), 'ok')
+        self.fail()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_lets_one_trial_through(self):
+        """Test that after the timeout a single trial call decides the state."""
+        for _ in range(3):
+            self.fail()
+        self.clock.now = 10
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())  # Trial in progress
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.retry_in(), 10)
+
+        self.clock.now = 20
+        self.assertEqual(self.breaker.call(lambda: 'ok'), 'ok')
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class HttpClientCircuitTest(SimpleTestCase):
+    def get_client(self, **kwargs):
+        client = HttpClient(failure_threshold=2, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_fails_fast_while_open(self):
+        """Test that an open circuit stops calling the upstream."""
+        client = self.get_client(reset_timeout=60)
+
+        with StubServer({'error': 'boom'}, status=500) as stub:
+            for _ in range(2):
+                with self.assertRaises(HTTPError):
+                    client.fetch_json(stub.url).result()
+            with self.assertRaises(CircuitOpenError):
+                client.fetch_json(stub.url).result()
+
+        self.assertEqual(stub.requests, 2)
+        status = client.status()[stub.url.rstrip('/')]
+        self.assertEqual(status['state'], CircuitBreaker.OPEN)
+        self.assertEqual(status['latency']['count'], 2)
+
+    def test_client_errors_do_not_open_the_circuit(self):
+        """Test that 4xx responses fail the call but not the upstream."""
+        client = self.get_client()
+
+        with StubServer({'error': 'not found'}, status=404) as stub:
+            for _ in range(3):
+                with self.assertRaises(HTTPError):
+                    client.fetch_json(stub.url).result()
+
+        self.assertEqual(stub.requests, 3)
+
+    def test_recovers_after_reset_timeout(self):
+        """Test that a successful trial call closes the circuit again."""
+        client = self.get_client(reset_timeout=0.1)
+
+        with StubServer({'error': 'boom'}, status=500) as stub:
+            for _ in range(2):
+                with self.assertRaises(HTTPError):
+                    client.fetch_json(stub.url).result()
+
+            stub.status, stub.body = 200, {'id': 1}
+            time.sleep(0.15)
+            self.assertEqual(client.fetch_json(stub.url).result(), {'id': 1})
+
+        self.assertEqual(client.status()[stub.url.rstrip('/')]['state'], 'closed')
+
+    def test_serves_stale_while_open(self):
+        """Test that cached responses are still served during an outage."""
+        client = self.get_client(ttl=0, stale_ttl=60, reset_timeout=60)
+
+        with StubServer({'id': 1}) as stub:
+            client.fetch_json(stub.url).result()
+            stub.status = 500
+
+            deadline = time.monotonic() + 5
+            while client.status()[stub.url.rstrip('/')]['state'] != 'open':
+                # Each call serves the cached body and refreshes it in the background
+                self.assertEqual(client.fetch_json(stub.url).result(), {'id': 1})
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+
+            requests = stub.requests
+            for _ in range(3):
+                self.assertEqual(client.fetch_json(stub.url).result(), {'id': 1})
+
+        self.assertEqual(stub.requests, requests)
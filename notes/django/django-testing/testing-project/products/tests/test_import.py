@@ -0,0 +1,249 @@
+import base64
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from products.cache import get_catalog_version
+from products.importer import clean_rows, import_products
+from products.models import Product, User
+
+
+class ImportProductsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_validates_with_product_form_rules(self):
+        """Test that rows get the same errors as ProductForm, one row at a time."""
+        valid, errors = clean_rows(
+            [
+                (2, {'name': 'Tablet', 'price': '299.99', 'stock_count': '50'}),
+                (3, {'name': '', 'price': '-100', 'stock_count': '-10'}),
+                (4, {'name': 'Pen', 'price': 'abc', 'stock_count': '1'}),
+                (5, 'Invalid JSON: Expecting value'),
+            ]
+        )
+
+        self.assertEqual([line for line, _ in valid], [2])
+        self.assertEqual(
+            dict(errors)[3],
+            {
+                'name': ['This field is required.'],
+                'price': ['Price cannot be negative'],
+                'stock_count': ['Stock Count cannot be negative'],
+            },
+        )
+        self.assertEqual(list(dict(errors)[4]), ['price'])
+        self.assertEqual(
+            dict(errors)[5], {'__all__': ['Invalid JSON: Expecting value']}
+        )
+
+    def test_import_csv_in_batches(self):
+        """Test that every valid row is created even when batches contain errors."""
+        lines = ['name,price,stock_count\n']
+        lines += [f'Product {i},{i}.50,{i}\n' for i in range(1, 8)]
+        lines += ['Broken,-1,1\n']
+
+        result = import_products(lines, 'csv', batch_size=3)
+
+        self.assertEqual(result.created, 7)
+        self.assertEqual(Product.objects.count(), 7)
+        self.assertEqual([line for line, _ in result.errors], [9])
+
+    def test_import_ndjson_creates_and_updates(self):
+        """Test that rows with an id update the existing product."""
+        product = Product.objects.create(name='Laptop', price=1000, stock_count=5)
+        lines = [
+            f'{{"id": {product.pk}, "name": "Laptop", "price": 900, "stock_count": 3}}\n',
+            '{"name": "Phone", "price": 800.5, "stock_count": 10}\n',
+            '\n',
+            '{"id": 9999, "name": "Ghost", "price": 1, "stock_count": 1}\n',
+            'not json\n',
+        ]
+
+        result = import_products(lines, 'ndjson')
+
+        self.assertEqual((result.created, result.updated), (1, 1))
+        product.refresh_from_db()
+        self.assertEqual((product.price, product.stock_count), (900, 3))
+        self.assertEqual([line for line, _ in result.errors], [4, 5])
+        self.assertIn('id', result.errors[0][1])
+
+    def test_database_errors_only_reject_their_row(self):
+        """Test that a constraint violation does not abort the rest of the batch."""
+        # The form allows a zero price, the database constraint does not
+        lines = [
+            'name,price,stock_count\n',
+            'Tablet,299.99,50\n',
+            'Free,0,10\n',
+            'Phone,800,10\n',
+        ]
+
+        result = import_products(lines, 'csv')
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual([line for line, _ in result.errors], [3])
+        self.assertFalse(Product.objects.filter(name='Free').exists())
+
+    def test_import_bumps_catalog_version(self):
+        """Test that a bulk import invalidates the cached product list once."""
+        version = get_catalog_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            import_products(['name,price,stock_count\n', 'Tablet,1,1\n'], 'csv')
+
+        self.assertEqual(get_catalog_version(), version + 1)
+
+
+def basic_auth(username, password):
+    credentials = base64.b64encode(f'{username}:{password}'.encode()).decode()
+    return {'HTTP_AUTHORIZATION': f'Basic {credentials}'}
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProductImportViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data for the import view."""
+        cls.url = reverse('products:api-products-import')
+        cls.user = User.objects.create_user(username='sync', password='secret')
+        cls.user.user_permissions.set(
+            Permission.objects.filter(codename__in=['add_product', 'change_product'])
+        )
+        cls.product = Product.objects.create(name='Tablet', price=300, stock_count=5)
+
+    def setUp(self):
+        self.client.defaults.update(basic_auth('sync', 'secret'))
+
+    def post_update(self, client, **extra):
+        upload = SimpleUploadedFile(
+            'products.csv',
+            f'id,name,price,stock_count\n{self.product.pk},Hacked,0.01,3\n'.encode(),
+        )
+        return client.post(self.url, {'file': upload}, **extra)
+
+    def assertProductUnchanged(self):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.name, 'Tablet')
+
+    def test_anonymous_upload_is_rejected(self):
+        """Test that a request without credentials gets a 401 and changes nothing."""
+        response = self.post_update(Client())
+
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Basic', response['WWW-Authenticate'])
+        self.assertProductUnchanged()
+
+    def test_wrong_password_is_rejected(self):
+        """Test that invalid or malformed credentials get a 401."""
+        for headers in (
+            basic_auth('sync', 'wrong'),
+            {'HTTP_AUTHORIZATION': 'Basic not-base64!'},
+            {'HTTP_AUTHORIZATION': 'Bearer secret'},
+        ):
+            with self.subTest(headers=headers):
+                response = self.post_update(Client(), **headers)
+                self.assertEqual(response.status_code, 401)
+        self.assertProductUnchanged()
+
+    def test_upload_requires_permissions(self):
+        """Test that a user without add and change permissions gets a 403."""
+        User.objects.create_user(username='viewer', password='secret')
+
+        response = self.post_update(Client(), **basic_auth('viewer', 'secret'))
+
+        self.assertEqual(response.status_code, 403)
+        self.assertProductUnchanged()
+
+    def test_upload_without_csrf_cookie(self):
+        """Test that a client enforcing CSRF checks can import with Basic auth."""
+        client = Client(enforce_csrf_checks=True, **basic_auth('sync', 'secret'))
+
+        response = self.post_update(client)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 1)
+
+    def test_upload_csv(self):
+        """Test that an uploaded CSV file is imported and errors are reported."""
+        upload = SimpleUploadedFile(
+            'products.csv', b'name,price,stock_count\nTablet,299.99,50\nBad,-1,1\n'
+        )
+        response = self.client.post(self.url, {'file': upload})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['created'], data['updated']), (1, 0))
+        self.assertEqual(data['errors'][0]['line'], 3)
+        self.assertEqual(
+            data['errors'][0]['errors'], {'price': ['Price cannot be negative']}
+        )
+
+    def test_upload_ndjson_with_explicit_format(self):
+        """Test that the format field overrides the file extension."""
+        upload = SimpleUploadedFile(
+            'products.txt', b'{"name": "Tablet", "price": 1, "stock_count": 1}\n'
+        )
+        response = self.client.post(self.url, {'file': upload, 'format': 'ndjson'})
+
+        self.assertEqual(response.json()['created'], 1)
+
+    @override_settings(PRODUCTS_IMPORT_BATCH_SIZE=2)
+    def test_upload_not_utf8_imports_nothing(self):
+        """Test that a bad byte after the first batches rejects the whole file."""
+        rows = b''.join(b'Tablet %d,1,1\n' % n for n in range(5))
+        upload = SimpleUploadedFile(
+            'products.csv', b'name,price,stock_count\n' + rows + b'Caf\xe9,1,1\n'
+        )
+        response = self.client.post(self.url, {'file': upload})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'file must be UTF-8 encoded'})
+        self.assertEqual(Product.objects.count(), 1)  # Only the setUpTestData one
+
+    def test_bad_requests(self):
+        """Test the responses for a missing file or an unknown format."""
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+
+        upload = SimpleUploadedFile('products.xml', b'<products/>')
+        response = self.client.post(self.url, {'file': upload})
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+
+class ImportProductsCommandTest(TestCase):
+    def test_command_imports_file(self):
+        """Test that the command imports a file and prints a summary."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'products.csv'
+            path.write_text('name,price,stock_count\nTablet,1,1\nBad,-1,1\n')
+            stdout, stderr = StringIO(), StringIO()
+
+            call_command('import_products', str(path), stdout=stdout, stderr=stderr)
+
+        self.assertIn('1 created, 0 updated, 1 rejected', stdout.getvalue())
+        self.assertIn('Line 3: price: Price cannot be negative', stderr.getvalue())
+        self.assertTrue(Product.objects.filter(name='Tablet').exists())
+
+    def test_command_rejects_file_not_utf8(self):
+        """Test that an undecodable file is reported before anything is written."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'products.csv'
+            path.write_bytes(b'name,price,stock_count\nTablet,1,1\nCaf\xe9,1,1\n')
+
+            with self.assertRaisesMessage(CommandError, 'nothing was imported'):
+                call_command('import_products', str(path), '--batch-size', '1')
+
+        self.assertFalse(Product.objects.exists())
+
+    def test_command_requires_known_format(self):
+        """Test that an unknown extension without --format is an error."""
+        with self.assertRaises(CommandError):
+            call_command('import_products', 'products.txt')
@@ -0,0 +1,269 @@
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from smtplib import SMTPDataError, SMTPRecipientsRefused
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import SimpleTestCase
+
+from products.mailer import BatchMailer
+from products.tests.benchmark import benchmark, report
+from products.tests.stub import SmtpStubServer
+
+
+class FlakyBackend(EmailBackend):
+    """In-memory backend that counts connections and fails on request.
+
+    ``failures`` maps the position of a message (counting every message the
+    backend was asked to send) to the exception raised for it.
+    """
+
+    def __init__(self, log, failures=None, **kwargs):
+        super().__init__(**kwargs)
+        self.log = log
+        self.failures = failures if failures is not None else {}
+
+    def open(self):
+        self.log['connections'] += 1
+
+    def send_messages(self, messages):
+        for _ in messages:
+            self.log['attempts'] += 1
+            error = self.failures.pop(self.log['attempts'], None)
+            if error is not None:
+                raise error
+        return super().send_messages(messages)
+
+
+def message(n):
+    return EmailMessage(f'Welcome {n}', 'Hi', 'admin@django.com', [f'{n}@example.com'])
+
+
+class BatchMailerTest(SimpleTestCase):
+    def setUp(self):
+        self.log = {'connections': 0, 'attempts': 0}
+        self.failures = {}
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dead_letter_path = Path(directory.name) / 'dead_letter.jsonl'
+
+    def get_mailer(self, **kwargs):
+        options = {
+            'window': 10,
+            'backoff': 0,
+            'dead_letter_path': self.dead_letter_path,
+            'connection_factory': lambda **options: FlakyBackend(
+                self.log, self.failures, **options
+            ),
+        }
+        return BatchMailer(**options | kwargs)
+
+    def dead_letters(self):
+        with open(self.dead_letter_path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_batches_share_a_connection(self):
+        """Test that messages are sent in batches, one connection per batch."""
+        mailer = self.get_mailer(batch_size=100)
+        for n in range(250):
+            mailer.send(message(n))
+        mailer.flush()
+
+        self.assertEqual(len(mail.outbox), 250)
+        self.assertEqual(self.log['connections'], 3)
+
+    def test_window_sends_partial_batch(self):
+        """Test that a partial batch is sent once the window closes."""
+        mailer = self.get_mailer(batch_size=100, window=0.05)
+        mailer.send(message(1))
+
+        deadline = time.monotonic() + 5
+        while not mail.outbox:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_retries_only_unsent_messages(self):
+        """Test that a dropped connection retries the rest of the batch once."""
+        self.failures[3] = ConnectionResetError('Connection lost')
+        mailer = self.get_mailer()
+        for n in range(5):
+            mailer.send(message(n))
+        mailer.flush()
+
+        self.assertEqual(
+            [m.subject for m in mail.outbox], [f'Welcome {n}' for n in range(5)]
+        )
+        self.assertEqual(self.log['connections'], 2)
+
+    def test_permanent_errors_are_dead_lettered(self):
+        """Test that a refused recipient does not stop or retry the batch."""
+        self.failures[2] = SMTPRecipientsRefused(
+            {'1@example.com': (550, b'No such user')}
+        )
+        mailer = self.get_mailer()
+        with self.assertLogs('products.mailer', level='ERROR'):
+            for n in range(3):
+                mailer.send(message(n))
+            mailer.flush()
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(self.log['connections'], 1)
+        self.assertEqual([r['to'] for r in self.dead_letters()], [['1@example.com']])
+
+    def test_rejected_message_does_not_stop_the_batch(self):
+        """Test that a 5xx reply dead-letters that message only."""
+        self.failures[2] = SMTPDataError(554, b'Message rejected')
+        mailer = self.get_mailer()
+        with self.assertLogs('products.mailer', level='ERROR'):
+            for n in range(4):
+                mailer.send(message(n))
+            mailer.flush()
+
+        self.assertEqual(
+            [m.subject for m in mail.outbox], ['Welcome 0', 'Welcome 2', 'Welcome 3']
+        )
+        self.assertEqual(self.log['attempts'], 4)
+        self.assertEqual([r['to'] for r in self.dead_letters()], [['1@example.com']])
+
+    def test_temporary_rejection_is_retried(self):
+        """Test that a 4xx reply retries the message on a new connection."""
+        self.failures[2] = SMTPDataError(451, b'Try again later')
+        mailer = self.get_mailer()
+        for n in range(3):
+            mailer.send(message(n))
+        mailer.flush()
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(self.log['connections'], 2)
+
+    def test_unexpected_errors_are_dead_lettered(self):
+        """Test that a message failing for a non-SMTP reason is set aside."""
+        self.failures[1] = ValueError('Header values may not contain linefeed')
+        mailer = self.get_mailer()
+        with self.assertLogs('products.mailer', level='ERROR'):
+            for n in range(2):
+                mailer.send(message(n))
+            mailer.flush()
+
+        self.assertEqual([m.subject for m in mail.outbox], ['Welcome 1'])
+        records = self.dead_letters()
+        self.assertEqual([r['subject'] for r in records], ['Welcome 0'])
+        self.assertIn('linefeed', records[0]['error'])
+
+    def test_gives_up_after_retries(self):
+        """Test that messages are dead-lettered once the retries are exhausted."""
+        self.failures.update({n: OSError('Connection refused') for n in (1, 2, 3)})
+        mailer = self.get_mailer(retries=2)
+
+        with self.assertLogs('products.mailer', level='ERROR'):
+            for n in range(2):
+                mailer.send(message(n))
+            mailer.flush()
+
+        self.assertEqual(mail.outbox, [])
+        records = self.dead_letters()
+        self.assertEqual([r['subject'] for r in records], ['Welcome 0', 'Welcome 1'])
+        self.assertIn('Connection refused', records[0]['error'])
+
+    def test_sends_inline_when_no_thread_can_start(self):
+        """Test that a message is sent right away if the thread cannot start."""
+        mailer = self.get_mailer()
+        error = RuntimeError("can't create new thread at interpreter shutdown")
+
+        with (
+            patch.object(threading.Thread, 'start', side_effect=error),
+            self.assertLogs('products.mailer', level='WARNING'),
+        ):
+            mailer.send(message(1))
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertTrue(mailer.flush(timeout=1))  # Nothing queued, no thread
+
+    def test_sends_inline_at_interpreter_exit(self):
+        """Test that no thread is started once the main thread has finished."""
+        mailer = self.get_mailer()
+
+        with (
+            patch('products.mailer._shutting_down', return_value=True),
+            self.assertLogs('products.mailer', level='WARNING'),
+        ):
+            mailer.send(message(1))
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIsNone(mailer._thread)
+
+    def test_flush_timeout(self):
+        """Test that flush gives up waiting after ``timeout`` seconds."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        class SlowBackend(FlakyBackend):
+            def send_messages(self, messages):
+                release.wait(5)
+                return super().send_messages(messages)
+
+        mailer = self.get_mailer(
+            connection_factory=lambda **options: SlowBackend(self.log, **options)
+        )
+        mailer.send(message(1))
+
+        self.assertFalse(mailer.flush(timeout=0.05))
+        release.set()
+        self.assertTrue(mailer.flush(timeout=5))
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@benchmark
+class BatchMailerBenchmark(SimpleTestCase):
+    USERS = 200
+    ROUND_TRIP = 0.001  # Seconds added to every SMTP reply
+
+    def test_benchmark(self):
+        """Compare one send_mail per user with the batching mailer over SMTP."""
+        with SmtpStubServer(delay=self.ROUND_TRIP) as smtp:
+            options = {
+                'backend': 'django.core.mail.backends.smtp.EmailBackend',
+                'host': '127.0.0.1',
+                'port': smtp.port,
+            }
+
+            start = time.perf_counter()
+            for n in range(self.USERS):
+                send_mail(
+                    f'Welcome {n}',
+                    'Hi',
+                    'admin@django.com',
+                    [f'{n}@example.com'],
+                    connection=get_connection(**options),
+                )
+            per_user = time.perf_counter() - start
+            per_user_connections = smtp.connections
+
+            mailer = BatchMailer(
+                batch_size=100,
+                window=10,
+                connection_factory=lambda **kw: get_connection(**options | kw),
+            )
+            start = time.perf_counter()
+            for n in range(self.USERS):
+                mailer.send(message(n))
+            mailer.flush()
+            batched = time.perf_counter() - start
+
+        self.assertEqual(len(smtp.messages), 2 * self.USERS)
+        self.assertEqual(smtp.connections - per_user_connections, 2)
+        report(
+            f'{self.USERS} welcome emails, {self.ROUND_TRIP * 1000:.0f} ms per SMTP reply',
+            [
+                (
+                    'send_mail per user',
+                    f'{per_user * 1000:8.1f} ms, {per_user_connections} connections',
+                ),
+                ('BatchMailer', f'{batched * 1000:8.1f} ms, 2 connections'),
+            ],
+        )
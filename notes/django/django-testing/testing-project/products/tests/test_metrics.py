@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+
+from products.metrics import LatencyHistogram
+
+
+class LatencyHistogramTest(SimpleTestCase):
+    def test_percentiles(self):
+        """Test that percentiles are the bounds of the buckets they fall in."""
+        histogram = LatencyHistogram(buckets_ms=(10, 100))
+        for seconds in [0.005] * 90 + [0.05] * 9 + [1]:
+            histogram.observe(seconds)
+
+        self.assertEqual(histogram.percentile(50), 10)
+        self.assertEqual(histogram.percentile(95), 100)
+        self.assertEqual(histogram.percentile(100), float('inf'))
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 100)
+        self.assertEqual(
+            snapshot['buckets'], {'le_10ms': 90, 'le_100ms': 9, 'overflow': 1}
+        )
+        self.assertEqual((snapshot['p95_ms'], snapshot['p99_ms']), (100, 100))
+
+    def test_empty(self):
+        """Test that an empty histogram has no percentiles."""
+        histogram = LatencyHistogram()
+
+        self.assertIsNone(histogram.percentile(50))
+        self.assertIsNone(histogram.snapshot()['p50_ms'])
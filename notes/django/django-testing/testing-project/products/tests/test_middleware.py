@@ -1,12 +1,45 @@
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import CommandError, call_command
+from django.template.base import Template
 from django.test import TestCase, override_settings
 from django.urls import reverse
 
+from products.maintenance import (
+    MAINTENANCE_KEY,
+    get_maintenance_mode,
+    set_maintenance_mode,
+)
+from products.metrics import get_request_stats
+from products.models import Product, User
+
 
 class MaintenanceModeTests(TestCase):
     @classmethod
     def setUpTestData(cls):
         cls.home_url = reverse('products:homepage')
 
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.flag_location = directory.name
+        self.enterContext(override_settings(CACHES=self.caches(directory.name)))
+
+    @staticmethod
+    def caches(location):
+        """Return CACHES with the flag in a file cache at ``location``."""
+        return settings.CACHES | {
+            'maintenance': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }
+        }
+
     @override_settings(MAINTENANCE_MODE=False)
     def test_maintenance_mode_off(self):
         response = self.client.get(self.home_url)
@@ -18,3 +51,137 @@ class MaintenanceModeTests(TestCase):
         response = self.client.get(self.home_url)
 
         self.assertContains(response, 'Site under maintenance', status_code=503)
+
+    def test_runtime_flag(self):
+        set_maintenance_mode(True)
+        response = self.client.get(self.home_url)
+
+        self.assertContains(response, 'Site under maintenance', status_code=503)
+
+    @override_settings(MAINTENANCE_LOCAL_TTL=60)
+    def test_flag_is_read_once_per_ttl(self):
+        self.client.get(self.home_url)
+        set_maintenance_mode(True)
+
+        response = self.client.get(self.home_url)
+
+        # The worker keeps its last read until the local TTL expires
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(MAINTENANCE_LOCAL_TTL=0)
+    def test_flag_is_picked_up_after_ttl(self):
+        self.client.get(self.home_url)
+        set_maintenance_mode(True)
+
+        response = self.client.get(self.home_url)
+        self.assertEqual(response.status_code, 503)
+
+        set_maintenance_mode(False)
+        response = self.client.get(self.home_url)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(MAINTENANCE_MODE=True, MAINTENANCE_ALLOWED_PATHS=('/login/',))
+    def test_allowed_paths_bypass_maintenance(self):
+        response = self.client.get(reverse('products:login'))
+
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(MAINTENANCE_MODE=True, MAINTENANCE_ALLOWED_IPS=('10.0.0.0/8',))
+    def test_allowed_ips_bypass_maintenance(self):
+        allowed = self.client.get(self.home_url, REMOTE_ADDR='10.1.2.3')
+        blocked = self.client.get(self.home_url, REMOTE_ADDR='192.168.1.1')
+
+        self.assertEqual(allowed.status_code, 200)
+        self.assertEqual(blocked.status_code, 503)
+
+    def test_management_command(self):
+        stdout = StringIO()
+
+        call_command('maintenance_mode', 'on', stdout=stdout)
+        self.assertTrue(get_maintenance_mode())
+        self.assertIn('Maintenance mode is on', stdout.getvalue())
+
+        call_command('maintenance_mode', 'off', stdout=stdout)
+        self.assertFalse(get_maintenance_mode())
+
+    def test_flag_is_shared_between_processes(self):
+        call_command('maintenance_mode', 'on', stdout=StringIO())
+
+        # What another process opening the same cache would read
+        other = FileBasedCache(self.flag_location, {})
+        self.assertIs(other.get(MAINTENANCE_KEY), True)
+
+    @override_settings(MAINTENANCE_CACHE_ALIAS='default')
+    def test_management_command_rejects_local_cache(self):
+        with self.assertRaisesMessage(CommandError, 'local to this process'):
+            call_command('maintenance_mode', 'on', stdout=StringIO())
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1.0)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product_list_url = reverse('products:product-list')
+        Product.objects.create(name='Laptop', price=1000, stock_count=5)
+
+    def setUp(self):
+        cache.clear()
+        get_request_stats().clear()
+
+    def test_server_timing_header(self):
+        response = self.client.get(self.product_list_url)
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^total;dur=[\d.]+, ')
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="1 queries"')
+        self.assertRegex(timing, r'template;dur=[\d.]+$')
+
+    def test_stats_per_url_name(self):
+        for _ in range(3):
+            self.client.get(self.product_list_url)
+        self.client.get(reverse('products:homepage'))
+
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        response = self.client.get(reverse('products:profiling-stats'))
+        stats = response.json()
+
+        product_list = stats['products:product-list']
+        self.assertEqual(product_list['sampled'], 3)
+        self.assertEqual(set(product_list['wall_ms']), {'p50', 'p95', 'p99'})
+        self.assertGreater(product_list['template_ms']['p50'], 0)
+        self.assertGreater(product_list['size_bytes']['p50'], 0)
+        # Only the first request misses the fragment cache and queries products
+        self.assertEqual(product_list['queries']['p99'], 1)
+        self.assertEqual(product_list['queries']['p50'], 0)
+        self.assertEqual(stats['products:homepage']['queries']['p50'], 0)
+
+    def test_stats_require_staff(self):
+        url = reverse('products:profiling-stats')
+
+        anonymous = self.client.get(url)
+        self.client.force_login(User.objects.create_user('customer'))
+        customer = self.client.get(url)
+
+        self.assertRedirects(anonymous, f'/admin/login/?next={url}')
+        self.assertRedirects(customer, f'/admin/login/?next={url}')
+
+    def test_template_render_is_restored(self):
+        render = Template.render
+
+        response = self.client.get(self.product_list_url)
+
+        self.assertRegex(response['Server-Timing'], r'template;dur=[\d.]+$')
+        self.assertIs(Template.render, render)
+
+    def test_streamed_responses_have_no_size(self):
+        self.client.get(reverse('products:api-products'))
+
+        stats = get_request_stats().summary()['products:api-products']
+        self.assertIsNone(stats['size_bytes']['p50'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_not_profiled(self):
+        response = self.client.get(self.product_list_url)
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(get_request_stats().summary(), {})
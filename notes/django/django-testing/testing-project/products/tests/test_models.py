@@ -1,6 +1,6 @@
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 from django.test import TestCase
 
 from products.models import Product
@@ -71,9 +71,68 @@ class ProductModelTest(TestCase):
         with self.assertRaises(IntegrityError):
             self.product.save()
 
-    def test_zero_stock_count_constraint(self):
-        """Test that a zero stock count raises an IntegrityError."""
+    def test_zero_stock_count_allowed(self):
+        """Test that a product can be sold out."""
         self.product.stock_count = 0
+        self.product.save()
 
-        with self.assertRaises(IntegrityError):
-            self.product.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_count, 0)
+
+
+class ProductQuerySetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.create(name='Laptop', price=1000, stock_count=5)
+        Product.objects.create(name='Cable', price='9.99', stock_count=100)
+        Product.objects.create(name='Phone', price=800, stock_count=10)
+
+    def test_in_stock(self):
+        """Test that in_stock() filters in SQL on stock_count."""
+        queryset = Product.objects.in_stock()
+
+        self.assertIn('"stock_count" > 0', str(queryset.query))
+        self.assertEqual(queryset.count(), 3)
+
+    def test_in_stock_uses_index(self):
+        """Test that in_stock() is served by the stock_count index."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plan text is SQLite specific')
+
+        self.assertIn('product_stock_count_idx', Product.objects.in_stock().explain())
+
+    def test_with_discounted_price_matches_python(self):
+        """Test that the annotation matches get_discounted_price rounded half up."""
+        Product.objects.create(name='Sticker', price=Decimal('1.25'), stock_count=1)
+
+        for percentage in (0, 10, 15, 50):
+            with self.subTest(percentage=percentage):
+                for product in Product.objects.with_discounted_price(percentage):
+                    self.assertEqual(
+                        product.discounted_price,
+                        product.get_discounted_price(percentage).quantize(
+                            Decimal('0.01'), rounding=ROUND_HALF_UP
+                        ),
+                    )
+
+    def test_with_discounted_price_rounds_half_up(self):
+        """Test that a price ending in half a cent rounds up, not to even."""
+        Product.objects.create(name='Sticker', price=Decimal('1.25'), stock_count=1)
+
+        product = Product.objects.with_discounted_price(50).get(name='Sticker')
+
+        self.assertEqual(product.discounted_price, Decimal('0.63'))
+
+    def test_filter_and_order_by_discounted_price(self):
+        """Test that the annotation can be filtered and ordered on in SQL."""
+        queryset = (
+            Product.objects.in_stock()
+            .with_discounted_price(20)
+            .filter(discounted_price__lt=700)
+            .order_by('-discounted_price')
+        )
+
+        self.assertEqual(
+            list(queryset.values_list('name', 'discounted_price')),
+            [('Phone', Decimal('640.00')), ('Cable', Decimal('7.99'))],
+        )
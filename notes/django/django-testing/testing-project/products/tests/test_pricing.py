@@ -0,0 +1,97 @@
+import time
+from decimal import Decimal
+
+from django.test import TestCase
+
+from products.models import Product
+from products.pricing import price_matrix
+from products.tests.benchmark import benchmark, report
+
+PERCENTAGES = (0, 10, 15, 33, 50)
+
+
+class PriceMatrixTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [
+            Product.objects.create(name='Laptop', price=1000, stock_count=5),
+            Product.objects.create(name='Cable', price='9.99', stock_count=100),
+            Product.objects.create(name='Pen', price='0.05', stock_count=1),
+        ]
+
+    def test_matches_get_discounted_price(self):
+        """Test that the exact matrix equals the per-instance method."""
+        matrix = price_matrix(self.products, PERCENTAGES)
+
+        for product in self.products:
+            for percentage in PERCENTAGES:
+                self.assertEqual(
+                    matrix.get(product.pk, percentage),
+                    product.get_discounted_price(percentage),
+                )
+
+    def test_accepts_querysets(self):
+        """Test that a queryset is priced with a single query."""
+        with self.assertNumQueries(1):
+            matrix = price_matrix(Product.objects.order_by('pk'), PERCENTAGES)
+
+        self.assertEqual(matrix.product_ids, tuple(p.pk for p in self.products))
+        self.assertEqual(matrix.as_dict()[self.products[0].pk][10], 900)
+
+    def test_cents_mode_rounds_half_up(self):
+        """Test that the cents mode rounds the exact price half up to the cent."""
+        matrix = price_matrix(self.products, (15, 50, Decimal('12.5')), cents=True)
+
+        cable, pen = self.products[1].pk, self.products[2].pk
+        self.assertEqual(matrix.get(cable, 15), 849)  # 8.4915
+        self.assertEqual(matrix.get(pen, 50), 3)  # 0.025
+        self.assertEqual(matrix.get(cable, Decimal('12.5')), 874)  # 8.74125
+
+    def test_cents_mode_accepts_float_percentages(self):
+        """Test that a float percentage is read as written, not as its binary value."""
+        matrix = price_matrix(self.products, (10.1,), cents=True)
+
+        self.assertEqual(matrix.get(self.products[0].pk, 10.1), 89_900)
+
+    def test_cents_mode_rejects_sub_cent_discounts(self):
+        """Test that a percentage with more than two decimals is rejected."""
+        with self.assertRaises(ValueError):
+            price_matrix(self.products, (Decimal('0.001'),), cents=True)
+
+
+@benchmark
+class PriceMatrixBenchmark(TestCase):
+    SIZE = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.bulk_create(
+            Product(name=f'Product {i}', price=Decimal(i) / 7 + 1, stock_count=1)
+            for i in range(cls.SIZE)
+        )
+        cls.products = list(Product.objects.all())
+
+    def test_benchmark(self):
+        """Compare the per-instance method with both price matrix modes."""
+        timings = {}
+
+        start = time.perf_counter()
+        expected = {
+            product.pk: {pct: product.get_discounted_price(pct) for pct in PERCENTAGES}
+            for product in self.products
+        }
+        timings['get_discounted_price'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        exact = price_matrix(self.products, PERCENTAGES)
+        timings['price_matrix'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        price_matrix(self.products, PERCENTAGES, cents=True)
+        timings['price_matrix(cents=True)'] = time.perf_counter() - start
+
+        self.assertEqual(exact.as_dict(), expected)
+        report(
+            f'{self.SIZE} products x {len(PERCENTAGES)} discounts',
+            [(name, f'{seconds * 1000:8.2f} ms') for name, seconds in timings.items()],
+        )
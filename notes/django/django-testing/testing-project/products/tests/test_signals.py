@@ -1,35 +1,224 @@
+import tempfile
+import time
+from pathlib import Path
+from smtplib import SMTPException
+from unittest import skipUnless
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings, tag
 
-from products.models import User
+from products import tasks
+from products.cache import get_catalog_version
+from products.mailer import get_mailer
+from products.models import Product, User
+from products.tasks import get_executor
+from project import celery_app
 
 
+def wait_for_tasks():
+    """Wait for the tasks submitted to the fallback thread pool and their emails."""
+    get_executor().shutdown(wait=True)
+    get_executor.cache_clear()
+    get_mailer().flush()
+
+
+@override_settings(MAILER_BATCH_WINDOW=0.05, MAILER_RETRY_BACKOFF=0)
 class UserSignalsTest(TestCase):
-    @patch('products.signals.send_mail')
-    def test_welcome_email_sent_on_user_creation(self, mock_send_mail):
+    def setUp(self):
+        get_mailer.cache_clear()
+
+    def test_welcome_email_sent_on_user_creation(self):
         """Tests that the welcome email signal sends an email when a new user is created."""
-        User.objects.create_user(
-            username='test', password='password', email='test@example.com'
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(
+                username='test', password='password', email='test@example.com'
+            )
+        wait_for_tasks()
 
-        mock_send_mail.assert_called_once_with(
-            'Thank you for signing up',  # Subject
-            'Welcome to the app',  # Message
-            'admin@django.com',  # From Email
-            ['test@example.com'],  # Recipient List
-            fail_silently=False,  # Match argument in signal
-        )
+        self.assertEqual(len(mail.outbox), 1)
+        email = mail.outbox[0]
+        self.assertEqual(email.subject, 'Thank you for signing up')
+        self.assertEqual(email.body, 'Welcome to the app')
+        self.assertEqual(email.from_email, 'admin@django.com')
+        self.assertEqual(email.to, ['test@example.com'])
 
-    @patch('products.signals.send_mail')
-    def test_no_email_sent_on_user_update(self, mock_send_email):
+    def test_no_email_sent_on_user_update(self):
         """Tests that the welcome email signal does not send an email when an existing user is updated."""
-        user = User.objects.create_user(
-            username='test', password='password', email='test@example.com'
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user(
+                username='test', password='password', email='test@example.com'
+            )
+        wait_for_tasks()
+
+        mail.outbox.clear()  # Forget the email sent for the creation step
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            user.email = 'new_test@example.com'  # Update the user and save (this triggers the signal again but 'created' will be False)
+            user.save()
+        wait_for_tasks()
+
+        self.assertEqual(callbacks, [])  # Nothing was queued for the update
+        self.assertEqual(mail.outbox, [])  # No email was sent after the update
+
+    def test_welcome_emails_sent_on_bulk_create(self):
+        """Tests that bulk_create queues one task that emails every new user."""
+        users = [
+            User(username=f'user{n}', email=f'user{n}@example.com') for n in range(3)
+        ]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            User.objects.bulk_create(users)
+        wait_for_tasks()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            sorted(email.to[0] for email in mail.outbox),
+            [f'user{n}@example.com' for n in range(3)],
+        )
+
+    def test_no_emails_for_bulk_create_with_conflicts(self):
+        """Tests that bulk_create with ignore_conflicts does not email existing users."""
+        User.objects.create_user(username='existing', email='existing@example.com')
+        wait_for_tasks()
+        mail.outbox.clear()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            User.objects.bulk_create(
+                [User(username='existing', email='existing@example.com')],
+                ignore_conflicts=True,
+            )
+        wait_for_tasks()
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(mail.outbox, [])
+
+    def test_email_waits_for_commit(self):
+        """Tests that nothing is sent while the signup transaction is still open."""
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            User.objects.create_user(
+                username='test', password='password', email='test@example.com'
+            )
+        wait_for_tasks()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(mail.outbox, [])
+
+    @patch.object(
+        EmailBackend, 'send_messages', side_effect=SMTPException('Connection refused')
+    )
+    def test_mail_failure_does_not_break_signup(self, mock_send_messages):
+        """Tests that a mail server error is logged and dead-lettered instead of failing the signup."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        dead_letter_path = Path(directory.name) / 'dead_letter.jsonl'
+
+        with override_settings(MAILER_DEAD_LETTER_PATH=dead_letter_path):
+            with self.assertLogs('products.mailer', level='ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    User.objects.create_user(
+                        username='test', password='password', email='test@example.com'
+                    )
+                wait_for_tasks()
+
+        self.assertTrue(User.objects.filter(username='test').exists())
+        self.assertIn('test@example.com', dead_letter_path.read_text())
+
+
+@tag('integration')
+@skipUnless(celery_app, 'Celery is not installed')
+@override_settings(CELERY_BROKER_URL='memory://', MAILER_BATCH_WINDOW=0.05)
+class CeleryWelcomeEmailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from celery.contrib.testing.worker import start_worker
+
+        celery_app.conf.update(
+            broker_url='memory://',
+            broker_transport_options={'polling_interval': 0.01},
+            result_backend='cache+memory://',
         )
+        cls.enterClassContext(start_worker(celery_app, perform_ping_check=False))
+
+    def setUp(self):
+        get_mailer.cache_clear()
+
+    def test_welcome_email_queued_on_celery(self):
+        """Tests that the welcome email goes through the broker to a Celery worker."""
+        task = tasks.send_welcome_email
+        with patch.object(task, 'delay', wraps=task.delay) as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                User.objects.create_user(
+                    username='test', password='password', email='test@example.com'
+                )
+
+        delay.assert_called_once_with('test@example.com')
+        deadline = time.monotonic() + 10
+        while not mail.outbox:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertEqual(mail.outbox[0].to, ['test@example.com'])
+
+
+class ProductSignalsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_catalog_version_bumped_once_on_save(self):
+        """Tests that saving a product moves the catalog version forward exactly once."""
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Tablet', price=300, stock_count=5)
+
+        self.assertEqual(get_catalog_version(), version + 1)
+
+    def test_catalog_version_bumped_once_on_delete(self):
+        """Tests that deleting a product moves the catalog version forward exactly once."""
+        product = Product.objects.create(name='Tablet', price=300, stock_count=5)
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+
+        self.assertEqual(get_catalog_version(), version + 1)
+
+    def test_catalog_version_bumped_once_on_bulk_create(self):
+        """Tests that bulk_create moves the catalog version forward once per call."""
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.bulk_create(
+                Product(name=f'Tablet {n}', price=300, stock_count=5) for n in range(3)
+            )
+
+        self.assertEqual(get_catalog_version(), version + 1)
+
+    def test_catalog_version_bumped_once_on_queryset_delete(self):
+        """Tests that a queryset delete moves the catalog version forward once."""
+        for n in range(3):
+            Product.objects.create(name=f'Tablet {n}', price=300, stock_count=5)
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted, _ = Product.objects.filter(name__startswith='Tablet').delete()
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(get_catalog_version(), version + 1)
+
+    def test_catalog_version_bumped_after_commit(self):
+        """Tests that the version only moves once the writing transaction commits."""
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Product.objects.create(name='Tablet', price=300, stock_count=5)
+            self.assertEqual(get_catalog_version(), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_catalog_version(), version + 1)
 
-        mock_send_email.reset_mock()  # Reset the mock to clear the call from the creation step
-        user.email = 'new_test@example.com'  # Update the user and save (this triggers the signal again but 'created' will be False)
-        user.save()
+    def test_catalog_version_recovers_from_eviction(self):
+        """Tests that an evicted version is replaced by a newer one, never reused."""
+        version = get_catalog_version()
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Tablet', price=300, stock_count=5)
 
-        mock_send_email.assert_not_called()  # Assert that send_mail was NOT called after the update
+        self.assertGreater(get_catalog_version(), version)
@@ -0,0 +1,198 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from importlib.util import find_spec
+from pathlib import Path
+from unittest import skipUnless
+
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, tag
+
+from products.models import Product
+from products.stock import InsufficientStock, release, reserve, reserve_many
+
+
+class StockTest(TestCase):
+    def setUp(self):
+        self.laptop = Product.objects.create(name='Laptop', price=1000, stock_count=5)
+        self.phone = Product.objects.create(name='Phone', price=800, stock_count=10)
+
+    def assertStock(self, product, expected):
+        product.refresh_from_db()
+        self.assertEqual(product.stock_count, expected)
+
+    def test_reserve(self):
+        """Test that reserving decrements the stock in a single UPDATE."""
+        with self.assertNumQueries(1):
+            reserve(self.laptop.pk, 3)
+
+        self.assertStock(self.laptop, 2)
+
+    def test_reserve_last_unit(self):
+        """Test that the whole stock can be reserved, but not more."""
+        reserve(self.laptop.pk, 5)
+        self.assertStock(self.laptop, 0)
+
+        with self.assertRaises(InsufficientStock) as cm:
+            reserve(self.laptop.pk, 1)
+
+        self.assertEqual(cm.exception.product_ids, [self.laptop.pk])
+        self.assertStock(self.laptop, 0)
+
+    def test_release(self):
+        """Test that releasing gives the units back."""
+        reserve(self.laptop.pk, 3)
+        release(self.laptop.pk, 3)
+
+        self.assertStock(self.laptop, 5)
+
+    def test_invalid_quantity(self):
+        """Test that quantities below one are rejected."""
+        with self.assertRaises(ValueError):
+            reserve(self.laptop.pk, 0)
+        with self.assertRaises(ValueError):
+            reserve_many({self.laptop.pk: 1, self.phone.pk: -1})
+
+    def test_reserve_many(self):
+        """Test that several products are reserved together."""
+        reserve_many({self.laptop.pk: 2, self.phone.pk: 10})
+
+        self.assertStock(self.laptop, 3)
+        self.assertStock(self.phone, 0)
+
+    def test_reserve_many_is_all_or_nothing(self):
+        """Test that one short product cancels the whole reservation."""
+        with self.assertRaises(InsufficientStock) as cm:
+            reserve_many({self.laptop.pk: 2, self.phone.pk: 11, 9999: 1})
+
+        self.assertEqual(cm.exception.product_ids, [self.phone.pk, 9999])
+        self.assertStock(self.laptop, 5)
+        self.assertStock(self.phone, 10)
+
+
+@tag('integration')
+class StockStressTest(SimpleTestCase):
+    """Many threads reserve the same products through their own connections.
+
+    Runs against a file-based SQLite database in WAL mode and, when ``PGDATABASE``
+    is set (plus the usual ``PGHOST``/``PGUSER``/``PGPASSWORD``), against a
+    throwaway PostgreSQL test database.
+    """
+
+    THREADS = 8
+    CHECKOUTS = 50  # Per thread
+    STOCK = 301
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The alias is added after the test runner set up its databases, so
+        # only this class creates (and destroys) a database for it
+        cls._directory = tempfile.TemporaryDirectory()
+        connections.settings['stress'] = cls.get_database()
+        cls.databases = {'stress'}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['stress'].close()
+        del connections['stress']
+        del connections.settings['stress']
+        cls._directory.cleanup()
+        super().tearDownClass()
+
+    @classmethod
+    def get_database(cls):
+        database = deepcopy(connections['default'].settings_dict)
+        database['TEST']['NAME'] = str(Path(cls._directory.name) / 'stress.sqlite3')
+        return database
+
+    def setUp(self):
+        connection = connections['stress']
+        name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        self.addCleanup(connection.creation.destroy_test_db, name, verbosity=0)
+
+        self.products = [
+            Product.objects.using('stress').create(
+                name=f'Product {i}', price=1, stock_count=self.STOCK
+            )
+            for i in range(2)
+        ]
+
+    def run_threads(self, checkout):
+        def worker(n):
+            try:
+                return [checkout(n, i) for i in range(self.CHECKOUTS)]
+            finally:
+                connections['stress'].close()
+
+        with ThreadPoolExecutor(self.THREADS) as executor:
+            return list(executor.map(worker, range(self.THREADS)))
+
+    def test_sqlite_uses_wal(self):
+        """Test that SQLite runs in WAL mode with the project's options."""
+        connection = connections['stress']
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_no_lost_updates(self):
+        """Test that concurrent single reservations never lose a decrement."""
+        product = self.products[0]
+
+        def checkout(n, i):
+            try:
+                reserve(product.pk, 1, using='stress')
+            except InsufficientStock:
+                return False
+            return True
+
+        reserved = sum(sum(results) for results in self.run_threads(checkout))
+
+        product.refresh_from_db(using='stress')
+        self.assertEqual(reserved, self.STOCK)
+        self.assertEqual(product.stock_count, 0)
+
+    def test_batched_reservations(self):
+        """Test that multi-product reservations in opposite orders stay consistent."""
+        first, second = (product.pk for product in self.products)
+
+        def checkout(n, i):
+            # Half of the threads list the products in the opposite order
+            quantities = {first: 1, second: 2} if n % 2 else {second: 2, first: 1}
+            try:
+                reserve_many(quantities, using='stress')
+            except InsufficientStock:
+                return False
+            return True
+
+        reserved = sum(sum(results) for results in self.run_threads(checkout))
+
+        stock = dict(Product.objects.using('stress').values_list('pk', 'stock_count'))
+        self.assertEqual(reserved, self.STOCK // 2)
+        self.assertEqual(stock, {first: self.STOCK - reserved, second: self.STOCK % 2})
+
+
+@skipUnless('PGDATABASE' in os.environ, 'Set PGDATABASE to run against PostgreSQL')
+@skipUnless(find_spec('psycopg'), 'psycopg is not installed')
+class PostgreSQLStockStressTest(StockStressTest):
+    @classmethod
+    def get_database(cls):
+        database = deepcopy(connections['default'].settings_dict)
+        database.update(
+            ENGINE='django.db.backends.postgresql',
+            NAME=os.environ['PGDATABASE'],
+            USER=os.environ.get('PGUSER', ''),
+            PASSWORD=os.environ.get('PGPASSWORD', ''),
+            HOST=os.environ.get('PGHOST', ''),
+            PORT=os.environ.get('PGPORT', ''),
+            OPTIONS={},
+        )
+        database['TEST']['NAME'] = None  # test_<PGDATABASE>, dropped afterwards
+        return database
@@ -1,10 +1,12 @@
-from unittest.mock import patch
+import json
 
-from django.test import SimpleTestCase, TestCase, tag
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings, tag
 from django.urls import reverse, reverse_lazy
-from requests.exceptions import RequestException
 
+from products.http import get_client
 from products.models import Product, User
+from products.tests.stub import StubServer
 
 
 class TestHomePage(SimpleTestCase):
@@ -32,6 +34,7 @@ class TestHomePage(SimpleTestCase):
 class TestProductsPage(TestCase):
     def setUp(self):
         """Set up a test response."""
+        cache.clear()  # The version only moves on commit: drop other tests' pages
         self.url = reverse('products:product-list')
         self.response = self.client.get(self.url)
 
@@ -56,7 +59,8 @@ class TestProductsPage(TestCase):
 
     def test_products_view_no_products(self):
         """Test the product list view when no products are available."""
-        Product.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.all().delete()
 
         # Re-run the get method
         self.response = self.client.get(self.url)
@@ -65,6 +69,193 @@ class TestProductsPage(TestCase):
         self.assertContains(self.response, 'No products available')
 
 
+@override_settings(PRODUCTS_PAGE_SIZE=2)
+class TestProductsPagination(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        """Create five products for a page size of two."""
+        cls.url = reverse('products:product-list')
+        cls.products = [
+            Product.objects.create(name=f'Product {n}', price=10, stock_count=1)
+            for n in range(1, 6)
+        ]
+
+    def setUp(self):
+        """Start every test with an empty fragment cache."""
+        cache.clear()
+
+    def test_first_page(self):
+        """Test that the first page holds the first products and links to the next page."""
+        response = self.client.get(self.url)
+        page = response.context['products']
+
+        self.assertEqual([p.name for p in page], ['Product 1', 'Product 2'])
+        self.assertTrue(page.has_next)
+        self.assertContains(response, f'?after={self.products[1].pk}')
+
+    def test_next_page_after_cursor(self):
+        """Test that the cursor returns the products after the given id."""
+        response = self.client.get(self.url, {'after': self.products[1].pk})
+
+        names = [p.name for p in response.context['products']]
+        self.assertEqual(names, ['Product 3', 'Product 4'])
+
+    def test_last_page_has_no_next_link(self):
+        """Test that the last page does not link to a next page."""
+        response = self.client.get(self.url, {'after': self.products[3].pk})
+        page = response.context['products']
+
+        self.assertEqual([p.name for p in page], ['Product 5'])
+        self.assertFalse(page.has_next)
+        self.assertNotContains(response, 'Next page')
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Test that a malformed cursor falls back to the first page."""
+        response = self.client.get(self.url, {'after': 'abc'})
+
+        names = [p.name for p in response.context['products']]
+        self.assertEqual(names, ['Product 1', 'Product 2'])
+
+    def test_page_loads_only_product_names(self):
+        """Test that the page is fetched in one query that defers unused columns."""
+        response = self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            products = list(response.context['products'])
+
+        self.assertEqual(products[0].get_deferred_fields(), {'price', 'stock_count'})
+
+    def test_invalid_post_renders_paginated_list(self):
+        """Test that a failed form submission renders the same paginated page."""
+        response = self.client.post(self.url, data={'name': ''})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['products']), 2)
+
+
+class TestProductListCache(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data for the cached product list."""
+        cls.url = reverse('products:product-list')
+        cls.product = Product.objects.create(name='Laptop', price=1000, stock_count=5)
+
+    def setUp(self):
+        """Start every test with an empty fragment cache."""
+        cache.clear()
+
+    def test_second_request_is_served_from_cache(self):
+        """Test that a repeated request renders the list without querying products."""
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertContains(response, 'Laptop')
+
+    def test_creating_a_product_invalidates_the_cache(self):
+        """Test that a new product shows up on the next request."""
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Phone', price=800, stock_count=10)
+
+        response = self.client.get(self.url)
+
+        self.assertContains(response, 'Phone')
+
+    def test_deleting_a_product_invalidates_the_cache(self):
+        """Test that a deleted product disappears on the next request."""
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+
+        response = self.client.get(self.url)
+
+        self.assertNotContains(response, 'Laptop')
+        self.assertContains(response, 'No products available')
+
+    def test_form_is_not_cached(self):
+        """Test that each response gets its own form, outside the cached fragment."""
+        self.client.get(self.url)
+        response = self.client.post(self.url, data={'name': '', 'price': 1})
+
+        self.assertContains(response, 'This field is required.')
+        self.assertContains(response, 'Laptop')
+
+
+@override_settings(PRODUCTS_API_CHUNK_SIZE=2)
+class TestProductApi(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data for the product API."""
+        cls.url = reverse('products:api-products')
+        Product.objects.create(name='Laptop', price=1000, stock_count=5)
+        Product.objects.create(name='Phone', price=800, stock_count=10)
+        Product.objects.create(name='Cable', price='9.99', stock_count=100)
+
+    def get_content(self, response):
+        """Consume the streamed response body."""
+        return b''.join(response.streaming_content).decode()
+
+    def test_streams_ndjson_by_default(self):
+        """Test that the catalog is streamed as one JSON object per line."""
+        response = self.client.get(self.url)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = self.get_content(response).splitlines()
+        self.assertEqual(
+            [json.loads(line)['name'] for line in lines], ['Laptop', 'Phone', 'Cable']
+        )
+        self.assertEqual(json.loads(lines[2])['price'], '9.99')
+
+    def test_streams_json_array(self):
+        """Test that format=json streams a valid JSON array across chunks."""
+        response = self.client.get(self.url, {'format': 'json'})
+
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = json.loads(self.get_content(response))
+        self.assertEqual([p['name'] for p in data], ['Laptop', 'Phone', 'Cable'])
+
+    def test_empty_json_array(self):
+        """Test that an empty result is still a valid JSON array."""
+        response = self.client.get(self.url, {'format': 'json', 'min_price': 5000})
+
+        self.assertEqual(json.loads(self.get_content(response)), [])
+
+    def test_filter_by_price_range(self):
+        """Test filtering by min_price and max_price."""
+        response = self.client.get(
+            self.url, {'format': 'json', 'min_price': '10', 'max_price': '900'}
+        )
+
+        data = json.loads(self.get_content(response))
+        self.assertEqual([p['name'] for p in data], ['Phone'])
+
+    def test_filter_by_in_stock(self):
+        """Test filtering by in_stock."""
+        response = self.client.get(self.url, {'format': 'json', 'in_stock': 'true'})
+        self.assertEqual(len(json.loads(self.get_content(response))), 3)
+
+        response = self.client.get(self.url, {'format': 'json', 'in_stock': 'false'})
+        self.assertEqual(json.loads(self.get_content(response)), [])
+
+    def test_invalid_filters_return_400(self):
+        """Test that malformed filters are rejected before streaming starts."""
+        for params in (
+            {'min_price': 'abc'},
+            {'min_price': 'NaN'},
+            {'max_price': 'Infinity'},
+            {'in_stock': 'maybe'},
+            {'format': 'xml'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+
 class TestProfilePage(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -90,49 +281,88 @@ class TestProfilePage(TestCase):
         self.assertContains(response, 'username')
 
 
-class TestGetPostView(TestCase):
+class TestGetPostView(SimpleTestCase):
     @classmethod
-    def setUpTestData(cls):
+    def setUpClass(cls):
         """Set up test data for the test suite."""
+        super().setUpClass()
         cls.post_url = reverse('products:get-post')  # URL for the view being tested.
-        cls.endpoint_url = (
-            'https://jsonplaceholder.typicode.com/posts/1'  # Mocked external API URL.
-        )
 
-    @patch('products.views.requests.get')
-    def test_post_view_success(self, mock_get):
+    def setUp(self):
+        """Start every test with a new HTTP client and an empty cache."""
+        get_client.cache_clear()
+        self.addCleanup(get_client.cache_clear)
+        self.addCleanup(lambda: get_client().close())
+
+    def test_post_view_success(self):
         """Test the 'get-post' view for a successful API call."""
-        mock_get.return_value.status_code = 200  # Mock API response status code.
         return_data = {
             'userId': 1,
             'id': 1,
             'title': 'Test Title',
             'body': 'Test Body',
-        }  # Mock API response data.
-        mock_get.return_value.json.return_value = return_data  # Mock API response JSON.
+        }  # Stub API response data.
+
+        with StubServer(return_data) as stub:
+            with self.settings(PRODUCTS_POST_URL=stub.url):
+                response = self.client.get(self.post_url)  # Send GET request.
+                self.client.get(self.post_url)  # Served from the cache.
 
-        response = self.client.get(self.post_url)  # Send GET request to the view.
         self.assertEqual(
             response.status_code, 200
         )  # Assert response status code is 200.
         self.assertJSONEqual(
             response.content, return_data
-        )  # Assert response JSON matches mocked data.
+        )  # Assert response JSON matches the stub data.
+        self.assertEqual(stub.requests, 1)  # Verify API was called once.
 
-        mock_get.assert_called_once_with(
-            self.endpoint_url
-        )  # Verify API was called once with correct URL.
-
-    @patch('products.views.requests.get')
-    def test_post_view_fail(self, mock_get):
+    def test_post_view_fail(self):
         """Test the 'get-post' view for a failed API call."""
-        mock_get.side_effect = RequestException  # Mock API call to raise an exception.
-        response = self.client.get(self.post_url)  # Send GET request to the view.
+        with StubServer({'error': 'boom'}, status=500) as stub:
+            with self.settings(PRODUCTS_POST_URL=stub.url):
+                response = self.client.get(self.post_url)  # Send GET request.
 
         self.assertEqual(
             response.status_code, 503
         )  # Assert response status code is 503.
+        self.assertEqual(stub.requests, 1)  # Verify API was called once.
+
+    def test_post_view_unreachable(self):
+        """Test the 'get-post' view when the API cannot be reached."""
+        with StubServer() as stub:
+            url = stub.url  # Nothing listens on this port once the stub stops.
 
-        mock_get.assert_called_once_with(
-            self.endpoint_url
-        )  # Verify API was called once with correct URL.
+        with self.settings(PRODUCTS_POST_URL=url):
+            response = self.client.get(self.post_url)
+
+        self.assertEqual(response.status_code, 503)
+
+
+class TestUpstreamStatus(TestCase):
+    def setUp(self):
+        """Start every test with a new HTTP client."""
+        get_client.cache_clear()
+        self.addCleanup(get_client.cache_clear)
+        self.addCleanup(lambda: get_client().close())
+        self.url = reverse('products:upstream-status')
+
+    def test_upstream_status(self):
+        """Test that the status endpoint reports each upstream's circuit and latency."""
+        with StubServer({'id': 1}) as stub, self.settings(PRODUCTS_POST_URL=stub.url):
+            self.client.get(reverse('products:get-post'))
+
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        response = self.client.get(self.url)
+
+        status = response.json()[stub.url.rstrip('/')]
+        self.assertEqual(status['state'], 'closed')
+        self.assertEqual(status['latency']['count'], 1)
+
+    def test_upstream_status_requires_staff(self):
+        """Test that anonymous and non-staff users are sent to the admin login."""
+        anonymous = self.client.get(self.url)
+        self.client.force_login(User.objects.create_user('customer'))
+        customer = self.client.get(self.url)
+
+        self.assertRedirects(anonymous, f'/admin/login/?next={self.url}')
+        self.assertRedirects(customer, f'/admin/login/?next={self.url}')
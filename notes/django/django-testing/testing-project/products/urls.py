@@ -10,4 +10,8 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('profile/', views.profile_view, name='profile'),
     path('get-post/', views.get_post, name='get-post'),
+    path('api/upstreams/', views.upstream_status, name='upstream-status'),
+    path('api/profiling/', views.profiling_stats, name='profiling-stats'),
+    path('api/products/', views.product_api, name='api-products'),
+    path('api/products/import/', views.product_import, name='api-products-import'),
 ]
@@ -1,17 +1,39 @@
-import requests
+import codecs
+from decimal import Decimal, InvalidOperation
+from itertools import batched
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
+from django.views.decorators.http import require_POST
 from requests.exceptions import RequestException
 
+from products.auth import basic_auth_required
+from products.cache import get_cache_alias, get_catalog_version
 from products.forms import ProductForm
+from products.http import get_client
+from products.importer import FORMATS, check_encoding, guess_format, import_products
+from products.metrics import get_request_stats
 from products.models import Product
+from products.pagination import KeysetPage, parse_cursor
 
 
 def homepage(request):
     return render(request, 'products/index.html')
 
 
+def get_product_page(request):
+    """Return the page of products after the ``?after=<id>`` cursor, loading only names."""
+    return KeysetPage(
+        Product.objects.only('name'),
+        after=parse_cursor(request.GET.get('after')),
+        size=getattr(settings, 'PRODUCTS_PAGE_SIZE', 20),
+    )
+
+
 def product_list(request):
     if request.method == 'POST':
         form = ProductForm(request.POST)
@@ -19,13 +41,121 @@ def product_list(request):
         if form.is_valid():
             form.save()
             return redirect('products:product-list')
+    else:
+        form = ProductForm()
+
+    # The page is only queried when its cached fragment is missing
+    context = {
+        'products': get_product_page(request),
+        'form': form,
+        'catalog_version': get_catalog_version(),
+        'cache_alias': get_cache_alias(),
+        'cache_timeout': getattr(settings, 'PRODUCTS_CACHE_TIMEOUT', 300),
+    }
+
+    return render(request, 'products/product_list.html', context)
+
+
+def filter_products(params):
+    """Apply the ``in_stock``, ``min_price`` and ``max_price`` query parameters.
+
+    Raises ``ValueError`` with a readable message for malformed values.
+    """
+    queryset = Product.objects.all()
+
+    in_stock = params.get('in_stock')
+    if in_stock is not None:
+        if in_stock.lower() in ('1', 'true', 'yes'):
+            queryset = queryset.in_stock()
+        elif in_stock.lower() in ('0', 'false', 'no'):
+            queryset = queryset.filter(stock_count__lte=0)
         else:
-            context = {'products': Product.objects.all(), 'form': form}
-            return render(request, 'products/product_list.html', context)
+            raise ValueError('in_stock must be true or false')
 
-    context = {'products': Product.objects.all(), 'form': ProductForm()}
+    for param, lookup in (('min_price', 'price__gte'), ('max_price', 'price__lte')):
+        if params.get(param) is not None:
+            try:
+                value = Decimal(params[param])
+            except InvalidOperation:
+                value = None
+            if value is None or not value.is_finite():  # NaN and Infinity parse
+                raise ValueError(f'{param} must be a number')
+            queryset = queryset.filter(**{lookup: value})
 
-    return render(request, 'products/product_list.html', context)
+    return queryset
+
+
+def product_api(request):
+    """Stream the catalog as NDJSON (default) or, with ``?format=json``, a JSON array.
+
+    Rows are read with ``iterator()`` and written a chunk at a time, so memory
+    use does not depend on the size of the catalog.
+    """
+    output = request.GET.get('format', 'ndjson')
+    if output not in ('ndjson', 'json'):
+        return JsonResponse({'error': 'format must be ndjson or json'}, status=400)
+
+    try:
+        queryset = filter_products(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    chunk_size = getattr(settings, 'PRODUCTS_API_CHUNK_SIZE', 2000)
+    rows = (
+        queryset.order_by('pk')
+        .values('id', 'name', 'price', 'stock_count')
+        .iterator(chunk_size=chunk_size)
+    )
+    encode = DjangoJSONEncoder(separators=(',', ':')).encode
+
+    def ndjson():
+        for chunk in batched(rows, chunk_size):
+            yield ''.join(encode(row) + '\n' for row in chunk)
+
+    def json_array():
+        yield '['
+        separator = ''
+        for chunk in batched(rows, chunk_size):
+            yield separator + ','.join(encode(row) for row in chunk)
+            separator = ','
+        yield ']'
+
+    if output == 'json':
+        return StreamingHttpResponse(json_array(), content_type='application/json')
+    return StreamingHttpResponse(ndjson(), content_type='application/x-ndjson')
+
+
+@require_POST
+@basic_auth_required('products.add_product', 'products.change_product')
+def product_import(request):
+    """Import the CSV or NDJSON file uploaded as ``file`` and report per-row errors.
+
+    Callers authenticate with HTTP Basic credentials (see ``products.auth``).
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'file is required'}, status=400)
+
+    format = request.POST.get('format') or guess_format(upload.name)
+    if format not in FORMATS:
+        return JsonResponse({'error': 'format must be csv or ndjson'}, status=400)
+
+    try:
+        check_encoding(upload.chunks())
+    except UnicodeDecodeError:
+        return JsonResponse({'error': 'file must be UTF-8 encoded'}, status=400)
+
+    result = import_products(codecs.iterdecode(upload, 'utf-8-sig'), format)
+
+    return JsonResponse(
+        {
+            'created': result.created,
+            'updated': result.updated,
+            'errors': [
+                {'line': line, 'errors': errors} for line, errors in result.errors
+            ],
+        }
+    )
 
 
 @login_required()
@@ -37,14 +167,25 @@ def login_view(request):
     return render(request, 'products/login.html')
 
 
-def get_post(request):
-    url = 'https://jsonplaceholder.typicode.com/posts/1'
+async def get_post(request):
+    url = getattr(
+        settings, 'PRODUCTS_POST_URL', 'https://jsonplaceholder.typicode.com/posts/1'
+    )
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-
-        data = response.json()
+        data = await get_client().get_json(url)
         return JsonResponse(data)
     except RequestException:
         return HttpResponse('Service unavailable', status=503)
+
+
+@staff_member_required
+def upstream_status(request):
+    """Report the circuit state and latency histogram of each upstream API."""
+    return JsonResponse(get_client().status())
+
+
+@staff_member_required
+def profiling_stats(request):
+    """Report p50/p95/p99 of the profiled requests, per URL name."""
+    return JsonResponse(get_request_stats().summary())
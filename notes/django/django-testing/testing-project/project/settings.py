@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'products.middleware.ProfilingMiddleware',
     'products.middleware.MaintenanceModeMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -78,10 +79,36 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # WAL lets readers run while a checkout writes, and IMMEDIATE takes
+            # the write lock when a transaction starts, so concurrent stock
+            # reservations wait for each other instead of failing. This
+            # applies to every atomic() block in the project, read-only ones
+            # included: all transactions are serialized on SQLite's single
+            # write lock, so keep them short
+            'init_command': 'PRAGMA journal_mode=WAL;',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared by every worker and by manage.py, unlike the in-memory cache
+    'maintenance': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'maintenance_cache',
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -127,3 +154,30 @@ AUTH_USER_MODEL = 'products.User'
 LOGIN_URL = '/login/'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 MAINTENANCE_MODE = False
+MAINTENANCE_CACHE_ALIAS = 'maintenance'  # Must be shared by every worker
+MAINTENANCE_LOCAL_TTL = 1.0  # Seconds each worker trusts its last read of the flag
+MAINTENANCE_ALLOWED_PATHS = ('/admin/',)
+MAINTENANCE_ALLOWED_IPS = ()  # Addresses or networks, e.g. ('10.0.0.0/8',)
+PRODUCTS_PAGE_SIZE = 20
+PRODUCTS_CACHE_ALIAS = 'default'
+PRODUCTS_CACHE_TIMEOUT = 300
+PRODUCTS_API_CHUNK_SIZE = 2000
+PRODUCTS_IMPORT_BATCH_SIZE = 1000
+PRODUCTS_POST_URL = 'https://jsonplaceholder.typicode.com/posts/1'
+PRODUCTS_HTTP_TIMEOUT = (3.05, 10)  # Connect and read timeouts, in seconds
+PRODUCTS_HTTP_CACHE_TTL = 60
+PRODUCTS_HTTP_STALE_TTL = 300
+PRODUCTS_HTTP_POOL_SIZE = 10
+PRODUCTS_HTTP_FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+PRODUCTS_HTTP_RESET_TIMEOUT = 30  # Seconds before an open circuit allows a trial call
+PROFILING_SAMPLE_RATE = 0.1  # Fraction of requests profiled by ProfilingMiddleware
+PROFILING_WINDOW = 1000  # Profiles kept per URL name for the percentiles
+# Background tasks run on Celery when it is installed and a broker is set,
+# e.g. CELERY_BROKER_URL = 'redis://localhost:6379/0', else in a thread pool
+TASKS_THREAD_POOL_SIZE = 4
+MAILER_BATCH_SIZE = 100  # Emails sent per SMTP connection
+MAILER_BATCH_WINDOW = 1.0  # Seconds to wait for more emails before sending
+MAILER_RETRIES = 3
+MAILER_RETRY_BACKOFF = 0.5  # Seconds, doubled on every retry
+MAILER_DEAD_LETTER_PATH = BASE_DIR / 'dead_letter_emails.jsonl'
+MAILER_SHUTDOWN_TIMEOUT = 10  # Seconds to wait for queued emails on exit